@@ -0,0 +1,508 @@
+"""插件目录抓取脚本的离线基准测试
+
+启动一个本地HTTP服务器模拟GitHub的REST API（/rate_limit、/repos、/releases、/tags、/git/trees）、
+GraphQL接口和raw文件服务，生成指定规模的合成插件目录，然后在独立子进程中端到端运行
+CatalogueScraper.run，报告运行时间、请求数、传输字节数和峰值内存。不访问网络，也不消耗GitHub额度。
+
+示例:
+    python scripts/benchmark.py --plugins 10 100 1000 --latency 20
+    python scripts/benchmark.py --plugins 1000 --engine async --runs 2 --cache
+    python scripts/benchmark.py --plugins 100 --output bench.json --baseline old_bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不统计峰值内存
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import plugin_scraper
+
+MONOREPO_EVERY = 10  # 每隔多少个仓库生成一个包含多个插件的仓库
+MONOREPO_SIZE = 3  # 多插件仓库中的插件数
+LARGE_REPO_EVERY = 100  # 每隔多少个仓库生成一个release超过一页的仓库
+LARGE_REPO_RELEASES = 120
+
+class SyntheticCatalogue:
+    """合成的插件目录及其对应的模拟仓库数据（同一种子生成的数据完全相同）"""
+
+    def __init__(self, plugin_count, seed=0, missing_rate=0.0, max_releases=8):
+        rng = random.Random(seed)
+        self.plugins = []  # [(插件ID, plugin_info), ...]
+        self.repos = {}  # 'owner/repo' -> 仓库数据
+
+        index = 0
+        repo_index = 0
+        while index < plugin_count:
+            size = MONOREPO_SIZE if repo_index % MONOREPO_EVERY == MONOREPO_EVERY - 1 else 1
+            plugin_ids = [f'bench_plugin_{i:05d}' for i in range(index, min(plugin_count, index + size))]
+            owner, name = f'bench-owner-{repo_index % 97}', f'bench-repo-{repo_index:05d}'
+            self.repos[f'{owner}/{name}'] = self._make_repo(rng, repo_index, plugin_ids, size > 1,
+                                                             rng.random() < missing_rate, max_releases)
+            for plugin_id in plugin_ids:
+                self.plugins.append((plugin_id, {
+                    'id': plugin_id,
+                    'authors': [{'name': owner, 'link': f'https://github.com/{owner}'}],
+                    'repository': f'https://github.com/{owner}/{name}',
+                    'branch': 'main',
+                    'related_path': plugin_id if size > 1 else '',
+                    'labels': [rng.choice(['tool', 'management', 'api', 'information'])],
+                    'introduction': {'en_us': 'README.md', 'zh_cn': 'README.md'}
+                }))
+            index += size
+            repo_index += 1
+
+    @staticmethod
+    def _make_repo(rng, repo_index, plugin_ids, monorepo, missing, max_releases):
+        release_count = LARGE_REPO_RELEASES if repo_index % LARGE_REPO_EVERY == LARGE_REPO_EVERY - 1 \
+            else rng.randint(0, max_releases)
+        releases = []
+        for k in range(release_count, 0, -1):
+            plugin_id = plugin_ids[k % len(plugin_ids)]
+            tag = f'{plugin_id}-v1.{k}.0' if monorepo else f'v1.{k}.0'
+            releases.append({
+                'id': repo_index * 1000 + k,
+                'tag_name': tag,
+                'prerelease': k == release_count and rng.random() < 0.2,
+                'assets': [{'name': f'{plugin_id}-v1.{k}.0.mcdr', 'download_count': rng.randint(0, 500)}]
+            })
+
+        files = {}
+        for plugin_id in plugin_ids:
+            path = f'{plugin_id}/mcdreforged.plugin.json' if monorepo else 'mcdreforged.plugin.json'
+            files[path] = json.dumps({
+                'id': plugin_id,
+                'version': f'1.{release_count}.0',
+                'name': plugin_id.replace('_', ' ').title(),
+                'description': {'en_us': f'Synthetic plugin {plugin_id}', 'zh_cn': f'合成插件 {plugin_id}'},
+                'dependencies': {'mcdreforged': '>=2.0.0'},
+                'author': ['bench']
+            }, ensure_ascii=False)
+        files['README.md'] = f'# {plugin_ids[0]}\n'
+
+        license_key = rng.choice(['mit', 'gpl-3.0', 'lgpl-3.0', None])
+        return {
+            'missing': missing,
+            'default_branch': 'main',
+            'pushed_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1700000000 + repo_index * 3600)),
+            'stars': rng.randint(0, 300),
+            'license': {'key': license_key, 'spdx_id': license_key.upper(),
+                        'url': f'https://api.github.com/licenses/{license_key}'} if license_key else None,
+            'releases': releases,
+            'tags': [release['tag_name'] for release in releases],
+            'files': files
+        }
+
+    def write_plugins(self, plugin_path):
+        """把插件目录写入plugin_path/<插件ID>/plugin_info.json"""
+        for plugin_id, plugin_info in self.plugins:
+            folder = os.path.join(plugin_path, plugin_id)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, 'plugin_info.json'), 'w', encoding='utf-8') as f:
+                json.dump(plugin_info, f, ensure_ascii=False, indent=2)
+
+class MockGitHubServer(ThreadingHTTPServer):
+    """模拟GitHub API的HTTP服务器，记录请求统计
+
+    Args:
+        catalogue: SyntheticCatalogue
+        latency: 每个请求的额外延迟（秒）
+        error_rate: API请求随机返回5xx的比例
+        rate_limit: 初始的core额度，用完后返回403
+    """
+
+    daemon_threads = True
+    request_queue_size = 256  # 默认的5在async引擎同时建立大量连接时会导致连接重传
+
+    def __init__(self, catalogue, latency=0.0, error_rate=0.0, rate_limit=1000000, seed=0):
+        super().__init__(('127.0.0.1', 0), MockGitHubHandler)
+        self.catalogue = catalogue
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def reset_stats(self):
+        with self.lock:
+            self.remaining = {'core': self.rate_limit, 'graphql': self.rate_limit}
+            self.reset_at = int(time.time()) + 3600
+            self.stats = {'requests': 0, 'bytes': 0, 'endpoints': {}, 'statuses': {}}
+
+    def record(self, endpoint, status, size):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats['endpoints'][endpoint] = self.stats['endpoints'].get(endpoint, 0) + 1
+            self.stats['statuses'][str(status)] = self.stats['statuses'].get(str(status), 0) + 1
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def take_budget(self, resource_name):
+        """消耗一次额度，返回(是否还有额度, 剩余额度)"""
+        with self.lock:
+            if self.remaining[resource_name] <= 0:
+                return False, 0
+            self.remaining[resource_name] -= 1
+            return True, self.remaining[resource_name]
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    """按GitHub的URL结构返回合成数据"""
+
+    protocol_version = 'HTTP/1.1'  # 保持连接，与真实API的连接复用行为一致
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写出，避免Nagle算法造成的延迟
+    GRAPHQL_REPO_PATTERN = re.compile(r'^  (r\d+): repository\(owner: ("[^"]*"), name: ("[^"]*")\) \{$', re.M)
+    GRAPHQL_REF_PATTERN = re.compile(r'(b\d+): ref\(qualifiedName: ("(?:[^"\\]|\\.)*")\)')
+    GRAPHQL_OBJECT_PATTERN = re.compile(r'(f\d+): object\(expression: ("(?:[^"\\]|\\.)*")\)')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = parse_qs(url.query)
+
+        if parts[0] == 'raw' and len(parts) >= 5:
+            self._handle_raw(parts[1], parts[2], parts[3], '/'.join(parts[4:]))
+        elif parts == ['rate_limit']:
+            self._handle_rate_limit()
+        elif parts[0] == 'repos' and len(parts) >= 3:
+            self._handle_repo(parts[1], parts[2], parts[3:], query)
+        else:
+            self._send('other', 404, {'message': 'Not Found'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path != '/graphql':
+            self._send('other', 404, {'message': 'Not Found'})
+            return
+        self._handle_graphql(json.loads(body).get('query', ''))
+
+    def _handle_rate_limit(self):
+        server = self.server
+        resources = {name: {'limit': server.rate_limit, 'remaining': remaining, 'reset': server.reset_at, 'used': 0}
+                     for name, remaining in server.remaining.items()}
+        self._send('rate_limit', 200, {'resources': resources, 'rate': resources['core']})
+
+    def _handle_repo(self, owner, name, rest, query):
+        endpoint = rest[0] if rest else 'repo'
+        if endpoint == 'git':
+            endpoint = 'trees'
+        if not self._admit(endpoint, 'core'):
+            return
+
+        repo = self.server.catalogue.repos.get(f'{owner}/{name}')
+        if repo is None or repo['missing']:
+            self._send(endpoint, 404, {'message': 'Not Found'})
+        elif not rest:
+            self._send(endpoint, 200, {
+                'full_name': f'{owner}/{name}',
+                'default_branch': repo['default_branch'],
+                'pushed_at': repo['pushed_at'],
+                'stargazers_count': repo['stars'],
+                'license': repo['license']
+            })
+        elif endpoint == 'releases':
+            per_page = int(query.get('per_page', ['30'])[0])
+            page = int(query.get('page', ['1'])[0])
+            releases = repo['releases'][(page - 1) * per_page:page * per_page]
+            headers = {}
+            if page * per_page < len(repo['releases']):
+                next_url = f'http://{self.headers["Host"]}/repos/{owner}/{name}/releases?per_page={per_page}&page={page + 1}'
+                headers['Link'] = f'<{next_url}>; rel="next"'
+            self._send(endpoint, 200, releases, headers)
+        elif endpoint == 'tags':
+            per_page = int(query.get('per_page', ['30'])[0])
+            page = int(query.get('page', ['1'])[0])
+            tags = repo['tags'][(page - 1) * per_page:page * per_page]
+            headers = {}
+            if page * per_page < len(repo['tags']):
+                next_url = f'http://{self.headers["Host"]}/repos/{owner}/{name}/tags?per_page={per_page}&page={page + 1}'
+                headers['Link'] = f'<{next_url}>; rel="next"'
+            self._send(endpoint, 200, [{'name': tag} for tag in tags], headers)
+        elif endpoint == 'trees' and len(rest) >= 3:
+            if rest[2] != repo['default_branch']:
+                self._send(endpoint, 404, {'message': 'Not Found'})
+                return
+            tree = [{'path': path, 'type': 'blob'} for path in repo['files']]
+            self._send(endpoint, 200, {'tree': tree, 'truncated': False})
+        else:
+            self._send(endpoint, 404, {'message': 'Not Found'})
+
+    def _handle_raw(self, owner, name, branch, path):
+        time.sleep(self.server.latency)
+        repo = self.server.catalogue.repos.get(f'{owner}/{name}')
+        content = None
+        if repo is not None and not repo['missing'] and branch == repo['default_branch']:
+            content = repo['files'].get(path)
+        if content is None:
+            self._send('raw', 404, b'404: Not Found')
+        else:
+            self._send('raw', 200, content.encode('utf-8'))
+
+    def _handle_graphql(self, query):
+        if not self._admit('graphql', 'graphql'):
+            return
+
+        catalogue = self.server.catalogue
+        matches = list(self.GRAPHQL_REPO_PATTERN.finditer(query))
+        data, errors = {}, []
+        for index, match in enumerate(matches):
+            alias, owner, name = match.group(1), json.loads(match.group(2)), json.loads(match.group(3))
+            block = query[match.end():matches[index + 1].start() if index + 1 < len(matches) else len(query)]
+            repo = catalogue.repos.get(f'{owner}/{name}')
+            if repo is None or repo['missing']:
+                data[alias] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [alias],
+                               'message': f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+                continue
+
+            license_data = repo['license'] or {}
+            node = {
+                'licenseInfo': {'key': license_data['key'], 'spdxId': license_data['spdx_id']} if license_data else None,
+                'pushedAt': repo['pushed_at'],
+                'stargazerCount': repo['stars'],
+                'defaultBranchRef': {'name': repo['default_branch']},
+                'releases': {
+                    'nodes': [{
+                        'databaseId': release['id'], 'tagName': release['tag_name'], 'isPrerelease': release['prerelease'],
+                        'releaseAssets': {'nodes': [{'name': asset['name'], 'downloadCount': asset['download_count']}
+                                                    for asset in release['assets']]}
+                    } for release in repo['releases'][:plugin_scraper.RELEASES_PAGE_SIZE]],
+                    'pageInfo': {'hasNextPage': len(repo['releases']) > plugin_scraper.RELEASES_PAGE_SIZE}
+                },
+                'refs': {
+                    'nodes': [{'name': tag} for tag in repo['tags'][:plugin_scraper.TAGS_PAGE_SIZE]],
+                    'pageInfo': {'hasNextPage': len(repo['tags']) > plugin_scraper.TAGS_PAGE_SIZE}
+                }
+            }
+            for ref_alias, qualified_name in self.GRAPHQL_REF_PATTERN.findall(block):
+                branch = json.loads(qualified_name)[len('refs/heads/'):]
+                node[ref_alias] = {'name': branch} if branch == repo['default_branch'] else None
+            for object_alias, expression in self.GRAPHQL_OBJECT_PATTERN.findall(block):
+                ref, _, path = json.loads(expression).partition(':')
+                content = repo['files'].get(path) if ref in ('HEAD', repo['default_branch']) else None
+                node[object_alias] = {'text': content} if content is not None else None
+            data[alias] = node
+
+        result = {'data': data}
+        if errors:
+            result['errors'] = errors
+        self._send('graphql', 200, result)
+
+    def _admit(self, endpoint, resource_name):
+        """模拟延迟、5xx错误和速率限制，请求可以继续处理时返回True"""
+        server = self.server
+        time.sleep(server.latency)
+        if server.should_fail():
+            self._send(endpoint, random.choice([500, 502, 503]), {'message': 'Server Error'})
+            return False
+
+        allowed, remaining = server.take_budget(resource_name)
+        self._rate_headers = {
+            'X-RateLimit-Limit': str(server.rate_limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(server.reset_at),
+            'X-RateLimit-Resource': resource_name
+        }
+        if not allowed:
+            self._send(endpoint, 403, {'message': 'API rate limit exceeded'})
+            return False
+        return True
+
+    def _send(self, endpoint, status, payload, headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        # 与GitHub相同，内容未变化时返回304
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8' if not isinstance(payload, bytes) else 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        for name, value in {**getattr(self, '_rate_headers', {}), **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self._rate_headers = {}
+        self.server.record(endpoint, status, len(body))
+
+def run_scraper(config, result_queue):
+    """在子进程中运行一次CatalogueScraper，返回运行时间和峰值内存"""
+    plugin_scraper.GITHUB_API_URL = config['base_url']
+    plugin_scraper.GITHUB_RAW_URL = config['base_url'] + '/raw'
+    cache_dir = os.path.join(config['work_dir'], '.cache')
+    scraper_config = plugin_scraper.ScraperConfig(
+        plugin_path=os.path.join(config['work_dir'], 'plugins'),
+        data_path=os.path.join(config['work_dir'], 'data'),
+        token='benchmark',
+        timeout=config['timeout'],
+        retry_count=config['retry'],
+        workers=config['workers'],
+        api_mode=config['api'],
+        engine=config['engine'],
+        async_concurrency=config['concurrency'],
+        graphql_batch_size=config['graphql_batch_size'],
+        cache_enabled=config['cache'],
+        cache_dir=os.path.join(cache_dir, 'http'),
+        release_state_path=os.path.join(cache_dir, 'releases.json'),
+        catalogue_state_path=os.path.join(cache_dir, 'catalogue.json'),
+        breaker_state_path=os.path.join(cache_dir, 'breakers.json')
+    )
+
+    plugin_scraper.configure_logging('info' if config['verbose'] else 'error')
+    start = time.perf_counter()
+    plugin_scraper.CatalogueScraper(scraper_config).run()
+    wall_time = time.perf_counter() - start
+
+    peak_rss = None
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux上单位为KB，macOS上为字节
+        peak_rss = peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+    with open(scraper_config.plugins_json_path, 'r', encoding='utf-8') as f:
+        plugin_count = len(json.load(f))
+    result_queue.put({'wall_time': wall_time, 'peak_rss': peak_rss, 'plugins': plugin_count})
+
+def run_benchmark(args, plugin_count):
+    """对一个规模的合成目录运行基准测试，返回每次运行的结果"""
+    catalogue = SyntheticCatalogue(plugin_count, args.seed, args.missing_rate, args.max_releases)
+    server = MockGitHubServer(catalogue, args.latency / 1000, args.error_rate, args.rate_limit, args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = []
+    # 每个规模使用独立的子进程，峰值内存互不影响
+    context = multiprocessing.get_context('spawn')
+    try:
+        with tempfile.TemporaryDirectory(prefix='plugin-bench-') as work_dir:
+            catalogue.write_plugins(os.path.join(work_dir, 'plugins'))
+            config = {
+                'base_url': server.base_url, 'work_dir': work_dir, 'timeout': args.timeout, 'retry': args.retry,
+                'workers': args.workers, 'api': args.api, 'engine': args.engine, 'concurrency': args.concurrency,
+                'graphql_batch_size': args.graphql_batch_size, 'cache': args.cache, 'verbose': args.verbose
+            }
+            for run in range(1, args.runs + 1):
+                server.reset_stats()
+                result_queue = context.Queue()
+                process = context.Process(target=run_scraper, args=(config, result_queue))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(f"规模 {plugin_count} 第 {run} 次运行失败，退出码 {process.exitcode}")
+
+                result = result_queue.get()
+                result.update(size=plugin_count, run=run, repos=len(catalogue.repos),
+                              requests=server.stats['requests'], bytes=server.stats['bytes'],
+                              endpoints=dict(server.stats['endpoints']), statuses=dict(server.stats['statuses']))
+                results.append(result)
+                print_result(result)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+def print_result(result):
+    peak_rss = f"{result['peak_rss'] / 1024 / 1024:.1f}MB" if result['peak_rss'] else '-'
+    print(f"{result['size']:>6} 个插件 第{result['run']}次: 耗时 {result['wall_time']:.2f}s，"
+          f"{result['requests']} 次请求，{result['bytes'] / 1024:.1f}KB，峰值内存 {peak_rss}，"
+          f"{result['plugins'] / max(result['wall_time'], 1e-9):.1f} 插件/秒")
+    endpoints = '，'.join(f'{name} {count}' for name, count in sorted(result['endpoints'].items()))
+    print(f"        请求分布: {endpoints}；状态码: {result['statuses']}")
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """与基准结果比较，请求数或耗时超出容差时返回False"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(item['size'], item['run']): item for item in json.load(f)['results']}
+
+    ok = True
+    for result in results:
+        base = baseline.get((result['size'], result['run']))
+        if base is None:
+            continue
+        for metric in ('requests', 'wall_time'):
+            if result[metric] > base[metric] * (1 + tolerance):
+                print(f"回归: {result['size']} 个插件第{result['run']}次运行的 {metric} "
+                      f"从 {base[metric]:.2f} 增加到 {result[metric]:.2f}")
+                ok = False
+    return ok
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='插件目录爬取脚本的离线基准测试')
+    parser.add_argument('--plugins', type=int, nargs='+', default=[10, 100, 1000],
+                        help='合成目录的插件数，可以指定多个规模，默认为 10 100 1000')
+    parser.add_argument('--runs', type=int, default=1,
+                        help='每个规模连续运行的次数（后续运行复用缓存和release汇总），默认为1')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='模拟服务器每个请求的延迟（毫秒），默认为0')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='API请求随机返回5xx的比例，默认为0')
+    parser.add_argument('--missing-rate', type=float, default=0,
+                        help='返回404的仓库比例，默认为0')
+    parser.add_argument('--rate-limit', type=int, default=1000000,
+                        help='模拟的API额度，用完后返回403，默认为1000000')
+    parser.add_argument('--max-releases', type=int, default=8,
+                        help='普通仓库的最大release数，默认为8')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子，默认为0')
+    parser.add_argument('--api', choices=['rest', 'graphql'], default='rest', help='获取仓库数据的方式，默认为rest')
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync', help='REST模式下的抓取引擎，默认为sync')
+    parser.add_argument('--workers', type=int, default=8, help='并发处理插件的线程数，默认为8')
+    parser.add_argument('--concurrency', type=int, default=64, help='async引擎的最大并发请求数，默认为64')
+    parser.add_argument('--graphql-batch-size', type=int, default=20, help='每个GraphQL查询包含的仓库数，默认为20')
+    parser.add_argument('--cache', action='store_true', help='启用HTTP响应缓存')
+    parser.add_argument('--timeout', type=int, default=15, help='请求超时时间（秒），默认为15')
+    parser.add_argument('--retry', type=int, default=3, help='请求重试次数，默认为3')
+    parser.add_argument('--output', type=str, default=None, help='将结果保存为JSON文件')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='与之前--output保存的结果比较，请求数或耗时超出容差时以非零状态退出')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='与基准比较的容差，默认为0.2（20%%）')
+    parser.add_argument('--verbose', action='store_true', help='显示抓取脚本的输出')
+    return parser.parse_args()
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    print(f"模式: {args.api}/{args.engine}，线程数: {args.workers}，延迟: {args.latency}ms，"
+          f"错误率: {args.error_rate}，404比例: {args.missing_rate}，缓存: {'启用' if args.cache else '关闭'}")
+
+    results = []
+    for plugin_count in args.plugins:
+        results.extend(run_benchmark(args, plugin_count))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if args.baseline and not compare_with_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit_code = main()
+    exit(exit_code)
@@ -0,0 +1,99 @@
+"""GraphQL录制回放的离线校验
+
+用固定种子生成与基准测试相同的合成插件目录（包含多插件仓库），先以REST模式从本地模拟服务器抓取，
+再以GraphQL模式回放仓库中录制的响应（scripts/fixtures/graphql），比较两次生成的plugins.json
+（忽略每次处理都会变化的更新时间）。回放时模拟服务器不应收到任何请求。不访问网络，也不需要令牌。
+
+修改了GraphQL查询或合成数据后需要重新录制:
+    python scripts/graphql_replay_check.py --record
+
+示例:
+    python scripts/graphql_replay_check.py
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import plugin_scraper
+from benchmark import SyntheticCatalogue, MockGitHubServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'graphql')
+PLUGIN_COUNT = 12  # 前9个仓库各一个插件，第10个仓库包含3个插件
+BATCH_SIZE = 5  # 每个查询包含的仓库数（使录制文件覆盖多个批次）
+SEED = 0
+
+def run_scraper(work_dir, name, **options):
+    """在work_dir下运行一次抓取，返回生成的插件数据"""
+    cache_dir = os.path.join(work_dir, name, '.cache')
+    config = plugin_scraper.ScraperConfig(
+        plugin_path=os.path.join(work_dir, 'plugins'),
+        data_path=os.path.join(work_dir, name, 'data'),
+        graphql_batch_size=BATCH_SIZE,
+        release_state_path=os.path.join(cache_dir, 'releases.json'),
+        catalogue_state_path=os.path.join(cache_dir, 'catalogue.json'),
+        breaker_state_path=os.path.join(cache_dir, 'breakers.json'),
+        **options
+    )
+    plugin_scraper.CatalogueScraper(config).run()
+    with open(config.plugins_json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def strip_volatile(plugins):
+    return [{key: value for key, value in plugin.items() if key not in plugin_scraper.VOLATILE_FIELDS}
+            for plugin in plugins]
+
+def main():
+    parser = argparse.ArgumentParser(description='GraphQL录制回放的离线校验')
+    parser.add_argument('--record', action='store_true',
+                        help=f'从模拟服务器重新录制GraphQL响应到{FIXTURES_DIR}')
+    args = parser.parse_args()
+
+    catalogue = SyntheticCatalogue(PLUGIN_COUNT, SEED)
+    server = MockGitHubServer(catalogue, seed=SEED)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    plugin_scraper.GITHUB_API_URL = server.base_url
+    plugin_scraper.GITHUB_RAW_URL = server.base_url + '/raw'
+    plugin_scraper.configure_logging('error')
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='graphql-replay-') as work_dir:
+            catalogue.write_plugins(os.path.join(work_dir, 'plugins'))
+            if args.record:
+                for name in os.listdir(FIXTURES_DIR) if os.path.isdir(FIXTURES_DIR) else []:
+                    os.remove(os.path.join(FIXTURES_DIR, name))
+                run_scraper(work_dir, 'record', token='replay-check', api_mode='graphql',
+                            graphql_fixtures=FIXTURES_DIR, graphql_record=True)
+                print(f"已录制 {len(os.listdir(FIXTURES_DIR))} 个GraphQL响应到 {FIXTURES_DIR}")
+
+            rest = run_scraper(work_dir, 'rest', token='replay-check')
+            server.reset_stats()
+            replay = run_scraper(work_dir, 'replay', api_mode='graphql', graphql_fixtures=FIXTURES_DIR)
+            requests_during_replay = server.stats['requests']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    ok = True
+    if requests_during_replay:
+        print(f"失败: 回放时发出了 {requests_during_replay} 次请求: {server.stats['endpoints']}")
+        ok = False
+    rest, replay = strip_volatile(rest), strip_volatile(replay)
+    if rest != replay:
+        replay_by_id = {plugin['id']: plugin for plugin in replay}
+        for plugin in rest:
+            other = replay_by_id.get(plugin['id'])
+            if plugin != other:
+                fields = sorted(key for key in set(plugin) | set(other or {})
+                                if plugin.get(key) != (other or {}).get(key))
+                print(f"失败: 插件 {plugin['id']} 的REST结果与GraphQL回放不同，字段: {', '.join(fields)}")
+        ok = False
+    if ok:
+        print(f"通过: GraphQL回放与REST模式生成的 {len(rest)} 个插件数据一致，回放时没有发出请求")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,27 +1,133 @@
 import os
+import sys
 import json
+import threading
 import requests
 from threading import Lock
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future
+from dataclasses import dataclass, field
+from contextlib import contextmanager, nullcontext
 import time
-from datetime import datetime
-import pytz
+import hashlib
+import gzip
+import math
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from zoneinfo import ZoneInfo
+import logging
 import re
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 from urllib3.util.retry import Retry
-from urllib.parse import urlparse
+from urllib.parse import urlparse, quote, unquote
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler
+import html
+import mimetypes
 import posixpath
+import unicodedata
 import argparse
 
 # 配置参数
 PLUGIN_PATH = "plugins"
 DATA_PATH = "data"
-PLUGINS_JSON_PATH = os.path.join(DATA_PATH, "plugins.json")
 config_path = ".config"
-GITHUB_TOKEN = None
 SSL_VERIFY = True  # 设置为True如果网络环境正常
 TIMEOUT = 15
 RETRY_COUNT = 3
+WORKERS = 1  # 并发处理插件的线程数，1 表示串行
+SECONDARY_RATE_LIMIT_WAIT = 60  # 触发次级速率限制且未给出Retry-After时的等待秒数
+SECONDARY_RATE_LIMIT_RETRIES = 3  # 触发次级速率限制后的最大重试次数
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '').lower() in ('1', 'true', 'yes')
+CACHE_DIR = os.path.join(".cache", "http")
+CACHE_SIZE_MB = 200  # 响应缓存的最大体积（MB）
+API_MODE = 'rest'  # 获取仓库数据的方式: rest 或 graphql
+GITHUB_API_URL = 'https://api.github.com'  # REST/GraphQL API地址（基准测试时指向本地模拟服务器）
+GITHUB_RAW_URL = 'https://raw.githubusercontent.com'  # 仓库文件的raw地址
+GRAPHQL_BATCH_SIZE = 20  # 每个GraphQL查询包含的仓库数
+GRAPHQL_FIXTURES = None  # GraphQL录制/回放目录
+GRAPHQL_RECORD = False  # 是否将GraphQL响应录制到GRAPHQL_FIXTURES
+RELEASES_PAGE_SIZE = 100  # 每页获取的release数量（REST API允许的最大值）
+RELEASE_STATE_PATH = os.path.join(".cache", "releases.json")  # 各仓库release下载数的持久化汇总
+CATALOGUE_STATE_PATH = os.path.join(".cache", "catalogue.json")  # 每个插件最近一次处理的时间（发布内容未变化时plugins.json不会重写）
+BREAKER_STATE_PATH = os.path.join(".cache", "breakers.json")  # 各仓库连续失败次数的持久化记录（熔断器状态）
+BREAKER_THRESHOLD = 3  # 仓库连续失败多少次运行后打开熔断器
+BREAKER_COOLDOWN_HOURS = 24  # 熔断器打开后跳过该仓库的时间（小时），之后每次试探失败加倍
+BREAKER_MAX_COOLDOWN_HOURS = 7 * 24  # 熔断冷却时间的上限（小时）
+REPO_GONE_STATUSES = (404, 410)  # 表示仓库确实不存在的状态码（只有这些计入熔断器的非暂时性失败）
+RELEASE_FULL_SCAN_HOURS = 24  # 每隔多少小时完整遍历一次所有release页以刷新旧release的下载数
+ENGINE = 'sync'  # REST模式下的抓取引擎: sync（requests线程池）或 async（asyncio/httpx）
+ASYNC_CONCURRENCY = 64  # async引擎同时进行的最大请求数
+RATE_LIMIT_RESERVE = 50  # 预留的API额度，剩余额度不足以处理下一个插件时停止
+SINCE_REF = None  # 只处理自该git引用以来plugin_info.json有变化的插件
+REFRESH_SLICE = 0  # 增量模式下每次额外刷新的最久未更新插件数
+STALE_MIN_INTERVAL = 3600  # 活跃仓库的最短刷新间隔（秒）
+STALE_MAX_INTERVAL = 24 * 3600  # 不活跃仓库的最长刷新间隔（秒）
+STALE_ACTIVITY_FACTOR = 30  # 刷新间隔 = 仓库距上次推送的时间 / 该系数（限制在上面两个间隔之间）
+TAGS_PAGE_SIZE = 100  # 每页获取的tag数量（REST API和GraphQL允许的最大值）
+RUN_REPORT_NAME = "run_report.json"  # 运行报告文件名（与plugins.json放在同一目录）
+PROMETHEUS_PATH = None  # Prometheus textfile输出路径，为None时不输出
+SHARDS_ENABLED = False  # 是否额外输出每个插件的分片文件
+SHARD_DIR_NAME = "plugins"  # 分片目录（位于数据目录下）
+SHARD_INDEX_NAME = "_index.json"  # 分片目录中的索引文件名（以下划线开头，不会与插件的分片重名）
+SHARD_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')  # 可以用作分片文件名的插件ID（不以下划线开头）
+CATALOGUE_META_NAME = "plugins.meta.json"  # 目录元数据文件名（内容哈希、插件数、生成时间）
+SEARCH_INDEX_NAME = "search_index.json"  # 插件页面使用的预构建搜索索引文件名
+PLUGIN_INFO_SCHEMA = {
+    'type': dict,
+    'properties': {
+        'id': {'type': str, 'required': True, 'pattern': r'^[a-z0-9_]{1,64}$'},
+        'name': {'type': str},
+        'repository': {'type': str, 'required': True,
+                       'pattern': r'^https://github\.com/[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+/?$'},
+        'branch': {'type': str, 'required': True, 'pattern': r'^[^\s~^:?*\[\\]+$'},
+        'related_path': {'type': str, 'pattern': r'^(?!/)(?!(.*/)?\.\.(/|$))'},
+        'labels': {'type': list, 'items': {'type': str, 'pattern': r'^\S+$'}},
+        'authors': {'type': list, 'items': {'type': dict, 'properties': {
+            'name': {'type': str, 'required': True, 'pattern': r'\S'},
+            'link': {'type': str, 'pattern': r'^https?://'}
+        }}},
+        'introduction': {'type': (str, dict), 'keys': r'^[a-z]{2}_[a-z]{2}$', 'values': {'type': str, 'pattern': r'\S'}}
+    }
+}  # plugin_info.json的格式；properties中没有列出的字段视为错误
+DEPENDENCIES_NAME = "dependencies.json"  # 依赖解析结果（每个插件的安装计划）文件名
+PLATFORM_DEPENDENCIES = ('mcdreforged', 'python')  # 不是插件的依赖项，只记录版本要求
+VERSION_PATTERN = re.compile(r'^v?(\d+(?:\.\d+)*)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')  # 语义化版本
+TAG_VERSION_PATTERN = re.compile(
+    r'^(?:(?P<prefix>[A-Za-z0-9_]*[A-Za-z_][A-Za-z0-9_]*)-)?[vV]?'
+    r'(?P<version>\d+(?:\.\d+)*(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?)$'
+)  # 标签名：[<插件ID>-][v]<版本号>；前缀不能全是数字，2024-01-01这样的日期标签没有前缀
+RELEASE_TAG_PREFIXES = ('release', 'rel', 'version', 'ver')  # 不是插件ID的常用标签前缀，如release-1.0
+PLAIN_VERSION_PATTERN = re.compile(r'^\d+(\.\d+)*$')  # 只有数字和点号的版本号
+VERSION_SEARCH_PATTERN = re.compile(r'(\d+\.\d+(\.\d+)*)')  # 标签名中任意位置的版本号
+REQUIREMENT_PATTERN = re.compile(
+    r'^(>=|<=|>|<|==|=|\^|~)?v?((?:\d+|[xX*])(?:\.(?:\d+|[xX*]))*)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$'
+)  # 版本要求中的单个条件，如 >=1.2.0、^2.0、1.x
+CJK_CHARACTERS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'  # 假名、汉字和谚文
+SEARCH_TOKEN_PATTERN = re.compile(f'([{CJK_CHARACTERS}]+)|([^\\W_{CJK_CHARACTERS}]+)')  # CJK连续字符或其他单词
+VOLATILE_FIELDS = ('update_time', 'update_time_timestamp')  # 每次处理都会变化、不计入内容哈希的字段
+CHANGES_JSON_NAME = "changes.json"  # 变更记录文件名
+CHANGES_ATOM_NAME = "changes.atom"  # 变更记录的Atom订阅源文件名
+CHANGES_WINDOW = 500  # changes.json中保留的最近变更集数
+SITE_URL = "https://looseprince.github.io/Plugin-Catalogue"  # 数据发布地址（用于Atom订阅源中的链接）
+README_MIRROR_ENABLED = False  # 是否镜像并预渲染每个插件的README
+README_DIR_NAME = "readme"  # README镜像目录（位于数据目录下）
+README_SOURCE_PATTERN = re.compile(r'^<!-- (.+) ([0-9a-f]{64}) -->$')  # README镜像文件首行记录的源文件地址和SHA256
+HISTORY_ENABLED = False  # 是否记录下载量、星标数和版本的历史快照并计算趋势
+HISTORY_DIR_NAME = "history"  # 历史快照目录（位于数据目录下）
+HISTORY_DAILY_DAYS = 35  # 保留每日快照的天数，更早的快照压缩为每月一个
+HISTORY_RETENTION_MONTHS = 24  # 保留每月快照的月数
+HISTORY_TREND_WINDOWS = (7, 30)  # 计算增量的时间窗口（天）
+DAEMON_LISTEN = '127.0.0.1:8080'  # 常驻模式HTTP接口的监听地址
+DAEMON_WATCH_INTERVAL = 10  # 常驻模式检查插件目录变化的间隔（秒）
+DAEMON_REFRESH_INTERVAL = 600  # 常驻模式按计划刷新插件的间隔（秒）
+DAEMON_REFRESH_SLICE = 20  # 常驻模式每次按计划刷新的插件数（未指定--refresh-slice时）
+LOG_LEVEL = 'info'  # 日志级别: debug、info、warning 或 error
+LOG_FORMAT = 'text'  # 日志格式: text（纯文本）或 json（每行一个JSON对象）
+BEIJING_TZ = ZoneInfo("Asia/Shanghai")
+
+logger = logging.getLogger('plugin_scraper')
 
 def parse_arguments():
     """解析命令行参数"""
@@ -34,9 +140,113 @@ def parse_arguments():
                         help=f'插件目录路径，默认为{PLUGIN_PATH}')
     parser.add_argument('--data-dir', type=str, default=DATA_PATH,
                         help=f'数据目录路径，默认为{DATA_PATH}')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'并发处理插件的线程数，默认为{WORKERS}（串行）')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR,
+                        help=f'HTTP响应缓存目录，默认为{CACHE_DIR}（需设置环境变量CACHE_ENABLED=true或使用--cache启用）')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE_MB,
+                        help=f'HTTP响应缓存的最大体积（MB），默认为{CACHE_SIZE_MB}')
+    parser.add_argument('--cache', action='store_true', default=CACHE_ENABLED,
+                        help='启用HTTP响应缓存（使用ETag/Last-Modified条件请求）')
+    parser.add_argument('--api', choices=['rest', 'graphql'], default=API_MODE,
+                        help=f'获取仓库数据的方式，默认为{API_MODE}；graphql会批量查询多个仓库')
+    parser.add_argument('--graphql-batch-size', type=int, default=GRAPHQL_BATCH_SIZE,
+                        help=f'每个GraphQL查询包含的仓库数，默认为{GRAPHQL_BATCH_SIZE}')
+    parser.add_argument('--graphql-fixtures', type=str, default=GRAPHQL_FIXTURES,
+                        help='GraphQL录制/回放目录；不加--graphql-record时从该目录回放响应，不访问网络')
+    parser.add_argument('--graphql-record', action='store_true', default=GRAPHQL_RECORD,
+                        help='将GraphQL响应录制到--graphql-fixtures指定的目录')
+    parser.add_argument('--release-state', type=str, default=RELEASE_STATE_PATH,
+                        help=f'release下载数汇总文件路径，默认为{RELEASE_STATE_PATH}')
+    parser.add_argument('--catalogue-state', type=str, default=CATALOGUE_STATE_PATH,
+                        help=f'每个插件最近处理时间的记录文件路径，默认为{CATALOGUE_STATE_PATH}')
+    parser.add_argument('--release-full-scan-hours', type=float, default=RELEASE_FULL_SCAN_HOURS,
+                        help=f'完整遍历所有release页的间隔（小时），默认为{RELEASE_FULL_SCAN_HOURS}')
+    parser.add_argument('--breaker-state', type=str, default=BREAKER_STATE_PATH,
+                        help=f'熔断器状态（各仓库连续失败次数）文件路径，默认为{BREAKER_STATE_PATH}')
+    parser.add_argument('--breaker-threshold', type=int, default=BREAKER_THRESHOLD,
+                        help=f'仓库连续失败多少次运行后打开熔断器，默认为{BREAKER_THRESHOLD}')
+    parser.add_argument('--breaker-cooldown-hours', type=float, default=BREAKER_COOLDOWN_HOURS,
+                        help=f'熔断器打开后跳过该仓库的小时数（每次试探失败加倍），默认为{BREAKER_COOLDOWN_HOURS}')
+    parser.add_argument('--engine', choices=['sync', 'async'], default=ENGINE,
+                        help=f'REST模式下的抓取引擎，默认为{ENGINE}；async需要安装httpx（HTTP/2需要httpx[http2]）')
+    parser.add_argument('--concurrency', type=int, default=ASYNC_CONCURRENCY,
+                        help=f'async引擎同时进行的最大请求数，默认为{ASYNC_CONCURRENCY}')
+    parser.add_argument('--rate-limit-reserve', type=int, default=RATE_LIMIT_RESERVE,
+                        help=f'预留的API额度，剩余额度不足时停止处理并保留未处理插件的已有数据，默认为{RATE_LIMIT_RESERVE}')
+    parser.add_argument('--since', type=str, default=SINCE_REF,
+                        help='只处理自该git引用以来plugin_info.json有变化的插件（以及新插件）')
+    parser.add_argument('--only-changed', action='store_true',
+                        help='只处理最近一次提交中有变化的插件，等同于--since HEAD~1')
+    parser.add_argument('--refresh-slice', type=int, default=REFRESH_SLICE,
+                        help='额外刷新最久未更新的N个插件（按更新时间和仓库活跃度排序），默认为0')
+    parser.add_argument('--prometheus', type=str, default=PROMETHEUS_PATH,
+                        help='将运行指标以Prometheus textfile格式写入指定文件')
+    parser.add_argument('--changes-window', type=int, default=CHANGES_WINDOW,
+                        help=f'changes.json中保留的最近变更集数，默认为{CHANGES_WINDOW}')
+    parser.add_argument('--validate-only', action='store_true',
+                        help='只校验所有插件的plugin_info.json（不访问网络），有错误时以状态码1退出')
+    parser.add_argument('--mirror-readme', action='store_true',
+                        help='镜像每个插件的README，预渲染为HTML写入数据目录下的readme/<插件ID>.html')
+    parser.add_argument('--history', action='store_true', default=HISTORY_ENABLED,
+                        help=f'在数据目录下的{HISTORY_DIR_NAME}/中记录每日快照，并向插件数据写入7天/30天增量和趋势排名')
+    parser.add_argument('--shards', action='store_true', default=SHARDS_ENABLED,
+                        help=f'额外将每个插件写入数据目录下的{SHARD_DIR_NAME}/<插件ID>.json，并生成索引{SHARD_INDEX_NAME}')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻模式：保持缓存常驻内存，监视插件目录、按计划刷新插件，并通过本地HTTP接口提供插件目录')
+    parser.add_argument('--listen', type=str, default=DAEMON_LISTEN,
+                        help=f'常驻模式HTTP接口的监听地址，默认为{DAEMON_LISTEN}')
+    parser.add_argument('--watch-interval', type=float, default=DAEMON_WATCH_INTERVAL,
+                        help=f'常驻模式检查插件目录变化的间隔（秒），默认为{DAEMON_WATCH_INTERVAL}')
+    parser.add_argument('--refresh-interval', type=float, default=DAEMON_REFRESH_INTERVAL,
+                        help=f'常驻模式按计划刷新插件的间隔（秒），每次刷新--refresh-slice个（未指定时为{DAEMON_REFRESH_SLICE}）'
+                             f'最久未更新的插件，默认为{DAEMON_REFRESH_INTERVAL}')
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], default=LOG_LEVEL,
+                        help=f'日志级别，默认为{LOG_LEVEL}；debug会输出每个请求和每个release的详细信息')
+    parser.add_argument('--log-format', choices=['text', 'json'], default=LOG_FORMAT,
+                        help=f'日志格式，默认为{LOG_FORMAT}；json格式每行输出一个JSON对象')
     
     return parser.parse_args()
 
+class TextLogFormatter(logging.Formatter):
+    """纯文本日志：只输出消息，警告和错误加上前缀"""
+
+    PREFIXES = {logging.WARNING: '警告: ', logging.ERROR: '错误: ', logging.CRITICAL: '错误: '}
+
+    def format(self, record):
+        text = self.PREFIXES.get(record.levelno, '') + record.getMessage()
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+class JsonLogFormatter(logging.Formatter):
+    """JSON日志：每条记录一行，extra={'fields': {...}}中的字段原样输出"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, BEIJING_TZ).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """配置脚本的日志输出（替换已有的处理器，可重复调用）
+
+    Args:
+        level: debug、info、warning 或 error
+        fmt: text 或 json
+        stream: 输出流，默认为标准输出
+    """
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(JsonLogFormatter() if fmt == 'json' else TextLogFormatter())
+    logger.handlers = [handler]
+    logger.setLevel(getattr(logging, level.upper()))
+    logger.propagate = False
+
 # 读取GitHub PAT
 def load_github_token():
     """加载GitHub令牌
@@ -50,30 +260,728 @@ def load_github_token():
     
     return os.environ.get('GITHUB_TOKEN')
 
-def create_session(retry_count, timeout):
+def get_secondary_rate_limit_backoff(response):
+    """判断响应是否触发了GitHub次级速率限制
+
+    Args:
+        response: 请求响应
+
+    Returns:
+        float | None: 需要等待的秒数，未触发时返回None
+    """
+    if response.status_code not in (403, 429):
+        return None
+
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(float(retry_after), 1.0)
+        except ValueError:
+            return float(SECONDARY_RATE_LIMIT_WAIT)
+
+    # 主速率限制（剩余额度为0）不属于次级限制，由调用方处理
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        return None
+
+    if 'secondary rate limit' in response.text.lower():
+        return float(SECONDARY_RATE_LIMIT_WAIT)
+
+    return None
+
+class RateLimitExhausted(Exception):
+    """GitHub API速率限制额度已用完"""
+
+class RepoUnavailable(Exception):
+    """仓库暂时无法访问（网络错误、超时、重试后仍为5xx），或其熔断器处于打开状态"""
+
+    def __init__(self, repo_key, reason, circuit_open=False):
+        super().__init__(f"仓库 {repo_key} {reason}")
+        self.repo_key = repo_key
+        self.circuit_open = circuit_open
+
+class RateLimitBudget:
+    """GitHub API速率限制预算
+
+    从每个响应的X-RateLimit-*头中跟踪各类资源（core、graphql等）的剩余额度，
+    按已处理插件的平均请求数估算剩余插件的开销。额度不足时由scan_plugins停止处理，
+    未处理的插件保留已有数据。304响应不计入额度。
+    """
+
+    DEFAULT_PLUGIN_COST = 6  # 还没有统计数据时每个插件预计消耗的core额度
+
+    def __init__(self, reserve=RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        self.resources = {}
+        self.plugins_done = 0
+        self.plugins_skipped = 0
+        self._lock = Lock()
+
+    def observe(self, response):
+        """根据响应头更新预算
+
+        Returns:
+            bool: 该响应是否表示额度已耗尽
+        """
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return False
+        
+        try:
+            remaining = int(remaining)
+            limit = int(response.headers.get('X-RateLimit-Limit', 0))
+            reset_at = int(response.headers.get('X-RateLimit-Reset', 0))
+        except ValueError:
+            return False
+        
+        resource = response.headers.get('X-RateLimit-Resource', 'core')
+        with self._lock:
+            state = self.resources.setdefault(resource, {'start': remaining, 'used': 0})
+            state.update(limit=limit, remaining=remaining, reset_at=reset_at)
+            if response.status_code != 304:
+                state['used'] += 1
+        
+        return response.status_code in (403, 429) and remaining == 0
+
+    def record_done(self):
+        """记录处理完一个插件（由工作线程调用）"""
+        with self._lock:
+            self.plugins_done += 1
+
+    def record_skipped(self):
+        """记录因额度不足跳过一个插件（由工作线程调用）"""
+        with self._lock:
+            self.plugins_skipped += 1
+
+    def refresh(self, session):
+        """通过/rate_limit（不计入额度）获取运行开始时的额度"""
+        try:
+            response = session.get(f'{GITHUB_API_URL}/rate_limit')
+        except Exception as e:
+            logger.warning("获取速率限制信息失败: %s", e)
+            return
+        if response.status_code != 200:
+            return
+        
+        with self._lock:
+            for resource, data in response.json().get('resources', {}).items():
+                self.resources[resource] = {
+                    'start': data.get('remaining', 0), 'used': 0, 'limit': data.get('limit', 0),
+                    'remaining': data.get('remaining', 0), 'reset_at': data.get('reset', 0)
+                }
+
+    def plugin_cost(self):
+        """每个插件预计消耗的core额度"""
+        with self._lock:
+            used = self.resources.get('core', {}).get('used', 0)
+            if self.plugins_done < 3:
+                return self.DEFAULT_PLUGIN_COST
+            return max(1.0, used / self.plugins_done)
+
+    def affordable_plugins(self):
+        """剩余额度预计还能处理的插件数，额度未知时返回None"""
+        with self._lock:
+            core = self.resources.get('core')
+            # 额度已重置时不再受之前的剩余额度限制
+            if core is None or core['reset_at'] <= time.time():
+                return None
+            remaining = core['remaining']
+        return max(0, int((remaining - self.reserve) // self.plugin_cost()))
+
+    def can_afford(self, plugin_count=1):
+        """剩余额度是否足够处理指定数量的插件（额度未知时视为足够）"""
+        affordable = self.affordable_plugins()
+        return affordable is None or affordable >= plugin_count
+
+    def usage(self):
+        """各类资源本次的使用情况（用于运行报告）"""
+        with self._lock:
+            return {resource: {'used': state['used'], 'remaining': state['remaining'], 'limit': state['limit']}
+                    for resource, state in sorted(self.resources.items()) if state['used']}
+
+    def report(self):
+        """输出本次运行的额度使用情况"""
+        with self._lock:
+            plugins_done, plugins_skipped = self.plugins_done, self.plugins_skipped
+            resources = dict(self.resources)
+        logger.info("速率限制预算: 处理 %s 个插件，因额度不足跳过 %s 个", plugins_done, plugins_skipped)
+        for resource, state in sorted(resources.items()):
+            if not state['used']:
+                continue
+            reset_time = datetime.fromtimestamp(state['reset_at']).strftime("%H:%M:%S")
+            logger.info("  %s: 本次使用 %s 次，剩余 %s/%s，%s 重置",
+                        resource, state['used'], state['remaining'], state['limit'], reset_time)
+
+def classify_request(url):
+    """根据URL判断请求的接口类型和所属仓库
+
+    Returns:
+        tuple: (接口名, 'owner/repo'或None)，接口名为repo、releases、tags、trees、raw、graphql、rate_limit或other
+    """
+    if url.startswith(GITHUB_RAW_URL + '/'):
+        parts = url[len(GITHUB_RAW_URL) + 1:].split('/')
+        return 'raw', f'{parts[0]}/{parts[1]}'.lower() if len(parts) >= 2 else None
+    
+    path = url[len(GITHUB_API_URL):] if url.startswith(GITHUB_API_URL) else urlparse(url).path
+    parts = path.split('?', 1)[0].strip('/').split('/')
+    if parts[0] == 'repos' and len(parts) >= 3:
+        repo_key = f'{parts[1]}/{parts[2]}'.lower()
+        if len(parts) == 3:
+            return 'repo', repo_key
+        return ('trees' if parts[3] == 'git' else parts[3]), repo_key
+    if parts[0] in ('graphql', 'rate_limit'):
+        return parts[0], None
+    return 'other', None
+
+def count_retries(response):
+    """urllib3的Retry在这次请求中重试的次数"""
+    retries = getattr(response.raw, 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+def percentile(sorted_values, fraction):
+    """已排序数据的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+class RunMetrics:
+    """本次运行的请求和插件耗时统计
+
+    每个GitHub请求记录接口、耗时、状态码、缓存命中情况、重试次数和响应字节数，
+    并归入所属仓库和当前线程正在处理的插件。运行结束后生成run_report.json，
+    也可以输出Prometheus textfile格式，用于找出拖慢运行的接口和仓库。
+    """
+
+    SLOWEST_COUNT = 10  # 报告中列出的最慢插件和仓库数
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoints = {}  # 接口名 -> 统计
+        self.repos = {}  # 'owner/repo' -> 统计
+        self.plugins = []  # 每个插件的处理统计
+        self._local = threading.local()
+        self._lock = Lock()
+
+    def record_request(self, url, status, seconds, size=0, retries=0, cache=None):
+        """记录一次请求
+
+        Args:
+            url: 请求地址
+            status: 状态码，请求异常时为None
+            seconds: 耗时（包括重试和等待）
+            size: 从网络接收的响应体字节数
+            retries: 重试次数
+            cache: 'hit'、'miss'，未启用缓存时为None
+        """
+        endpoint, repo_key = classify_request(url)
+        status_key = str(status) if status is not None else 'error'
+        plugin = getattr(self._local, 'plugin', None)
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'latencies': [], 'statuses': {}, 'bytes': 0, 'retries': 0, 'cache_hits': 0, 'cache_misses': 0
+            })
+            stats['latencies'].append(seconds)
+            stats['statuses'][status_key] = stats['statuses'].get(status_key, 0) + 1
+            stats['bytes'] += size
+            stats['retries'] += retries
+            if cache == 'hit':
+                stats['cache_hits'] += 1
+            elif cache == 'miss':
+                stats['cache_misses'] += 1
+            
+            if repo_key is not None:
+                repo_stats = self.repos.setdefault(repo_key, {'requests': 0, 'seconds': 0.0, 'bytes': 0, 'retries': 0})
+                repo_stats['requests'] += 1
+                repo_stats['seconds'] += seconds
+                repo_stats['bytes'] += size
+                repo_stats['retries'] += retries
+        
+        if plugin is not None:
+            plugin['requests'] += 1
+            plugin['request_seconds'] += seconds
+            plugin['bytes'] += size
+            plugin['retries'] += retries
+
+    @contextmanager
+    def plugin(self, plugin_id):
+        """统计一个插件的处理耗时，期间当前线程发出的请求都计入该插件
+
+        Yields:
+            dict: 该插件的统计，调用方可以设置其中的result
+        """
+        record = {'id': plugin_id, 'seconds': 0.0, 'requests': 0, 'request_seconds': 0.0,
+                  'bytes': 0, 'retries': 0, 'result': 'ok'}
+        self._local.plugin = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._local.plugin = None
+            with self._lock:
+                self.plugins.append(record)
+
+    def endpoint_summary(self):
+        """每个接口的请求数、p50/p95/最大耗时（毫秒）、字节数、重试和缓存命中"""
+        summary = {}
+        with self._lock:
+            endpoints = {name: dict(stats, latencies=sorted(stats['latencies'])) for name, stats in self.endpoints.items()}
+        for name, stats in sorted(endpoints.items()):
+            latencies = stats['latencies']
+            summary[name] = {
+                'requests': len(latencies),
+                'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                'total_seconds': round(sum(latencies), 3),
+                'bytes': stats['bytes'],
+                'retries': stats['retries'],
+                'cache_hits': stats['cache_hits'],
+                'cache_misses': stats['cache_misses'],
+                'statuses': dict(sorted(stats['statuses'].items()))
+            }
+        return summary
+
+    def build_report(self, extra=None):
+        """生成运行报告"""
+        endpoints = self.endpoint_summary()
+        with self._lock:
+            plugins = [dict(plugin) for plugin in self.plugins]
+            repos = [{'repo': key, **stats} for key, stats in self.repos.items()]
+        
+        for item in plugins + repos:
+            for key in ('seconds', 'request_seconds'):
+                if key in item:
+                    item[key] = round(item[key], 3)
+        plugins.sort(key=lambda item: item['seconds'], reverse=True)
+        repos.sort(key=lambda item: item['seconds'], reverse=True)
+        
+        results = {}
+        for plugin in plugins:
+            results[plugin['result']] = results.get(plugin['result'], 0) + 1
+        report = {
+            'generated_at': get_beijing_time(),
+            'wall_seconds': round(time.perf_counter() - self.started, 3),
+            'plugins': {'total': len(plugins), 'results': results},
+            'requests': {
+                'total': sum(item['requests'] for item in endpoints.values()),
+                'bytes': sum(item['bytes'] for item in endpoints.values()),
+                'retries': sum(item['retries'] for item in endpoints.values()),
+                'cache_hits': sum(item['cache_hits'] for item in endpoints.values()),
+                'cache_misses': sum(item['cache_misses'] for item in endpoints.values())
+            },
+            'endpoints': endpoints,
+            'slowest_plugins': plugins[:self.SLOWEST_COUNT],
+            'slowest_repos': repos[:self.SLOWEST_COUNT]
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def write_report(self, report, path):
+        """写入run_report.json"""
+        with atomic_write(path) as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def write_prometheus(self, report, path):
+        """以Prometheus textfile格式写入主要指标（供node_exporter的textfile收集器读取）"""
+        lines = []
+        
+        def gauge(name, help_text, samples):
+            lines.append(f'# HELP plugin_scraper_{name} {help_text}')
+            lines.append(f'# TYPE plugin_scraper_{name} gauge')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f'plugin_scraper_{name}{{{label_text}}} {value}' if label_text else f'plugin_scraper_{name} {value}')
+        
+        endpoints = report['endpoints'].items()
+        gauge('run_seconds', 'Wall time of the last scraper run.', [({}, report['wall_seconds'])])
+        gauge('plugins', 'Plugins handled in the last run by result.',
+              [({'result': result}, count) for result, count in sorted(report['plugins']['results'].items())])
+        gauge('requests', 'GitHub requests in the last run by endpoint and status.',
+              [({'endpoint': endpoint, 'status': status}, count)
+               for endpoint, stats in endpoints for status, count in stats['statuses'].items()])
+        gauge('request_duration_seconds', 'GitHub request latency quantiles in the last run.',
+              [({'endpoint': endpoint, 'quantile': quantile}, stats[key] / 1000)
+               for endpoint, stats in endpoints for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'))])
+        gauge('response_bytes', 'Response bytes received in the last run.',
+              [({'endpoint': endpoint}, stats['bytes']) for endpoint, stats in endpoints])
+        gauge('retries', 'Requests retried by the HTTP adapter in the last run.',
+              [({'endpoint': endpoint}, stats['retries']) for endpoint, stats in endpoints])
+        gauge('cache_hits', 'Conditional requests answered from the cache in the last run.',
+              [({'endpoint': endpoint}, stats['cache_hits']) for endpoint, stats in endpoints])
+        
+        with atomic_write(path) as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def print_summary(self, report):
+        """输出各接口耗时和最慢的几个插件"""
+        requests_total = report['requests']
+        logger.info("运行耗时 %.1f秒，共 %s 次请求，%.1fKB，重试 %s 次", report['wall_seconds'],
+                    requests_total['total'], requests_total['bytes'] / 1024, requests_total['retries'])
+        for endpoint, stats in report['endpoints'].items():
+            logger.info("  %s: %s 次，p50 %sms，p95 %sms，最长 %sms",
+                        endpoint, stats['requests'], stats['p50_ms'], stats['p95_ms'], stats['max_ms'])
+        for plugin in report['slowest_plugins'][:5]:
+            logger.info("  最慢插件 %s: %s秒，%s 次请求", plugin['id'], plugin['seconds'], plugin['requests'])
+
+class HostThrottle:
+    """单个主机的自适应并发控制
+
+    正常情况下最多允许 max_concurrency 个请求同时进行；
+    触发次级速率限制时并发上限减半，并在等待时间内暂停该主机的所有请求，
+    之后每连续成功一定次数再逐步恢复并发上限。
+    """
+
+    RECOVER_AFTER = 20  # 连续成功多少次后并发上限加一
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.success_streak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待直到允许发出新的请求"""
+        with self._cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                else:
+                    self._cond.wait()
+
+    def release(self, backoff=None):
+        """请求结束，backoff不为None时表示触发了次级速率限制"""
+        with self._cond:
+            self.in_flight -= 1
+            if backoff is not None:
+                self.limit = max(1, self.limit // 2)
+                self.resume_at = max(self.resume_at, time.monotonic() + backoff)
+                self.success_streak = 0
+            else:
+                self.success_streak += 1
+                if self.limit < self.max_concurrency and self.success_streak >= self.RECOVER_AFTER:
+                    self.limit += 1
+                    self.success_streak = 0
+            self._cond.notify_all()
+
+class ResponseCache:
+    """持久化的HTTP响应缓存
+
+    以URL为键保存响应体及其ETag/Last-Modified校验值，用于发送条件请求。
+    GitHub对返回304的条件请求不计入主速率限制。
+
+    磁盘格式（可直接由actions/cache在运行之间保存）::
+
+        <cache_dir>/index.json       URL -> 校验值、响应头、体积、最近访问时间
+        <cache_dir>/bodies/<sha1>    响应体
+
+    总体积超过上限时按最近最少使用（LRU）顺序淘汰。
+    """
+
+    INDEX_VERSION = 1
+    STORED_HEADERS = ('Content-Type', 'Link', 'ETag', 'Last-Modified')
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._load()
+
+    def _load(self):
+        """加载缓存索引，按最近访问时间恢复LRU顺序"""
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        if not os.path.exists(self.index_path):
+            return
+        
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("无法读取缓存索引 %s，将重建缓存: %s", self.index_path, e)
+            return
+        
+        if index.get('version') != self.INDEX_VERSION:
+            return
+        
+        entries = sorted(index.get('entries', {}).items(), key=lambda item: item[1].get('last_access', 0))
+        for url, entry in entries:
+            if os.path.exists(os.path.join(self.bodies_dir, entry['file'])):
+                self._entries[url] = entry
+                self.total_bytes += entry.get('size', 0)
+
+    @staticmethod
+    def key_for(url, params=None):
+        """计算请求的缓存键（带查询参数的完整URL）"""
+        if not params:
+            return url
+        prepared = requests.models.PreparedRequest()
+        prepared.prepare_url(url, params)
+        return prepared.url
+
+    def lookup(self, url):
+        """查找缓存的响应，返回(条目, 响应体)，不存在时返回None"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            try:
+                with open(os.path.join(self.bodies_dir, entry['file']), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                self._remove(url)
+                return None
+            return entry, body
+
+    @staticmethod
+    def validators(entry):
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """保存带有校验值的200响应"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        
+        body = response.content
+        file_name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        entry = {
+            'file': file_name,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers},
+            'size': len(body),
+            'last_access': int(time.time())
+        }
+        
+        with self._lock:
+            with open(os.path.join(self.bodies_dir, file_name), 'wb') as f:
+                f.write(body)
+            old_entry = self._entries.pop(url, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry.get('size', 0)
+            self._entries[url] = entry
+            self.total_bytes += entry['size']
+            self._evict()
+
+    def touch(self, url):
+        """标记缓存条目被使用（移到LRU队尾）"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry['last_access'] = int(time.time())
+                self._entries.move_to_end(url)
+
+    def build_response(self, url, entry, body, not_modified):
+        """用缓存内容构造一个200响应，并带上304响应中的最新响应头（如速率限制信息）"""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = body
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        for name, value in not_modified.headers.items():
+            if name.lower() not in ('content-length', 'content-encoding', 'transfer-encoding'):
+                response.headers[name] = value
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        return response
+
+    def _remove(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.get('size', 0)
+        try:
+            os.remove(os.path.join(self.bodies_dir, entry['file']))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """淘汰最近最少使用的条目，直到总体积不超过上限"""
+        while self.total_bytes > self.max_bytes and self._entries:
+            url = next(iter(self._entries))
+            self._remove(url)
+
+    def save(self):
+        """将缓存索引写回磁盘"""
+        with self._lock:
+            index = {'version': self.INDEX_VERSION, 'entries': dict(self._entries)}
+            with atomic_write(self.index_path) as f:
+                json.dump(index, f, ensure_ascii=False)
+        logger.info("HTTP缓存: 命中 %s 次，未命中 %s 次，共 %s 条，%.1fMB",
+                    self.hits, self.misses, len(self._entries), self.total_bytes / 1024 / 1024)
+
+class ScraperSession(requests.Session):
+    """带默认超时、默认请求头和按主机限流的会话
+
+    所有工作线程共享同一个会话，次级速率限制会让同一主机上的请求一起退避。
+    api_headers（User-Agent、Accept和令牌）随每个请求发送，async引擎也使用同样的请求头。
+    """
+
+    def __init__(self, timeout, max_concurrency=1, cache=None, budget=None, metrics=None, api_headers=None,
+                 verify=SSL_VERIFY):
+        super().__init__()
+        self.api_headers = dict(api_headers or {})
+        self.headers.update(self.api_headers)
+        self.verify = verify
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.budget = budget
+        self.metrics = metrics
+        self._throttles = {}
+        self._throttles_lock = Lock()
+
+    def get_throttle(self, host):
+        """获取（或创建）指定主机的限流器"""
+        with self._throttles_lock:
+            throttle = self._throttles.get(host)
+            if throttle is None:
+                throttle = HostThrottle(self.max_concurrency)
+                self._throttles[host] = throttle
+            return throttle
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        
+        start = time.perf_counter()
+        try:
+            response, network_response, retries, cache_state = self._cached_request(method, url, **kwargs)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_request(url, None, time.perf_counter() - start)
+            raise
+        
+        if self.metrics is not None:
+            self.metrics.record_request(url, network_response.status_code, time.perf_counter() - start,
+                                        len(network_response.content), retries, cache_state)
+        return response
+
+    def _cached_request(self, method, url, **kwargs):
+        """发送请求（有缓存时使用条件请求）
+
+        Returns:
+            tuple: (返回给调用方的响应, 网络响应, 重试次数, 缓存状态)
+        """
+        if self.cache is None or method.upper() != 'GET':
+            response, retries = self._throttled_request(method, url, **kwargs)
+            return response, response, retries, None
+        
+        # 有缓存时发送条件请求，304直接使用缓存内容
+        cache_key = ResponseCache.key_for(url, kwargs.get('params'))
+        cached = self.cache.lookup(cache_key)
+        if cached is not None:
+            entry, body = cached
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **ResponseCache.validators(entry)}
+        
+        response, retries = self._throttled_request(method, url, **kwargs)
+        
+        if response.status_code == 304 and cached is not None:
+            self.cache.hits += 1
+            self.cache.touch(cache_key)
+            return self.cache.build_response(cache_key, entry, body, response), response, retries, 'hit'
+        
+        self.cache.misses += 1
+        if response.status_code == 200:
+            self.cache.store(cache_key, response)
+        return response, response, retries, 'miss'
+
+    def _throttled_request(self, method, url, **kwargs):
+        """发送请求，触发次级速率限制时退避重试
+
+        Returns:
+            tuple: (响应, 重试次数)，重试次数包括Retry适配器的重试和次级速率限制的重试
+        """
+        throttle = self.get_throttle(urlparse(url).netloc)
+        retries = 0
+
+        for attempt in range(SECONDARY_RATE_LIMIT_RETRIES + 1):
+            throttle.acquire()
+            backoff = None
+            try:
+                response = super().request(method, url, **kwargs)
+                backoff = get_secondary_rate_limit_backoff(response)
+            finally:
+                throttle.release(backoff)
+            # Retry适配器的重试次数，加上次级速率限制导致的重新请求
+            retries += count_retries(response) + (1 if attempt else 0)
+
+            if backoff is None and self.budget is not None and self.budget.observe(response):
+                raise RateLimitExhausted(f"API额度已用完: {url}")
+
+            if backoff is None or attempt == SECONDARY_RATE_LIMIT_RETRIES:
+                return response, retries
+
+            logger.warning("触发次级速率限制，%.0f秒后重试: %s", backoff, url)
+
+        return response, retries
+
+def github_headers(token=None):
+    """访问GitHub时使用的请求头，token为None时不带令牌"""
+    headers = {
+        'User-Agent': 'MCDReforged-Plugin-Scraper',
+        'Accept': 'application/vnd.github.v3+json'
+    }
+    if token:
+        headers['Authorization'] = f'token {token}'
+    return headers
+
+def create_session(retry_count, timeout, workers=1, cache=None, budget=None, metrics=None, token=None,
+                   verify=SSL_VERIFY):
     """创建HTTP会话
     
     Args:
         retry_count: 重试次数
         timeout: 超时时间（秒）
+        workers: 共享该会话的工作线程数
+        cache: 响应缓存（ResponseCache），为None时不使用缓存
+        budget: 速率限制预算（RateLimitBudget），为None时不跟踪额度
+        metrics: 运行统计（RunMetrics），为None时不记录请求耗时
+        token: GitHub令牌，为None时不带令牌
+        verify: 是否校验TLS证书
         
     Returns:
-        requests.Session: 配置好的会话对象
+        ScraperSession: 配置好的会话对象
     """
-    session = requests.Session()
+    session = ScraperSession(timeout, max_concurrency=workers, cache=cache, budget=budget, metrics=metrics,
+                             api_headers=github_headers(token), verify=verify)
     retries = Retry(
         total=retry_count,
         backoff_factor=0.5,
         status_forcelist=[500, 502, 503, 504]
     )
-    session.mount('https://', HTTPAdapter(max_retries=retries))
-    session.timeout = timeout
+    # 连接池至少要容纳所有工作线程，否则多出的连接会被丢弃重建
+    pool_size = max(10, workers)
+    adapter = HTTPAdapter(max_retries=retries, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
     return session
 
 def get_beijing_time():
     """获取当前北京时间，返回格式化的时间和时间戳"""
-    tz = pytz.timezone("Asia/Shanghai")
-    now = datetime.now(tz)
+    now = datetime.now(BEIJING_TZ)
     return {
         'formatted': now.strftime("%Y-%m-%d %H:%M:%S"),
         'timestamp': int(now.timestamp())
@@ -94,221 +1002,2244 @@ def parse_github_url(url):
     
     return path_parts[0], path_parts[1]
 
-def get_file_content(session, owner, repo, path, branch='main'):
-    """获取仓库中指定文件的内容"""
-    url = f'https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={branch}'
-    response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
+@dataclass
+class RepoInfo:
+    """仓库基本信息（/repos/{owner}/{repo}）"""
+    license: str = None  # SPDX ID（缩写形式）
+    license_url: str = None
+    last_update_time: str = None
+    stars: int = 0
+    default_branch: str = None
+
+@dataclass
+class ReleaseAsset:
+    """发布附件"""
+    name: str
+    download_count: int = 0
+
+@dataclass
+class Release:
+    """仓库的一个发布（/repos/{owner}/{repo}/releases 中的一项）"""
+    tag_name: str
+    prerelease: bool = False
+    assets: list = field(default_factory=list)
+    id: int = 0
+    downloads: int = 0  # .mcdr和.pyz附件的下载次数之和
+
+def count_asset_downloads(assets):
+    """计算附件的下载次数，只计算.mcdr和.pyz文件"""
+    total = 0
+    for asset in assets:
+        asset_name = asset.name.lower()
+        if asset_name.endswith('.mcdr') or asset_name.endswith('.pyz'):
+            total += asset.download_count
+    return total
+
+class ReleaseStateStore:
+    """各仓库release下载数的持久化汇总
+
+    保存每个仓库所有release的ID、标签、是否预发布以及下载数，
+    使后续运行只需重新获取最新的几页release，更早的release直接使用保存的下载数；
+    每隔一段时间完整遍历一次，以刷新旧release的下载数并移除已删除的release。
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, path, full_scan_interval):
+        self.path = path
+        self.full_scan_interval = full_scan_interval
+        self._repos = {}
+        self._lock = Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("无法读取release汇总 %s，将完整遍历所有release: %s", self.path, e)
+            return
+        if state.get('version') == self.STATE_VERSION:
+            self._repos = state.get('repos', {})
+
+    def get(self, repo_key):
+        """获取仓库的汇总，返回(上次完整遍历时间, [Release, ...])，没有记录时返回None"""
+        with self._lock:
+            repo_state = self._repos.get(repo_key)
+        if repo_state is None:
+            return None
+        releases = [Release(tag_name=tag_name, prerelease=prerelease, id=release_id, downloads=downloads)
+                    for release_id, tag_name, prerelease, downloads in repo_state['releases']]
+        return repo_state['full_scan_at'], releases
+
+    def needs_full_scan(self, repo_key):
+        """判断仓库是否需要完整遍历所有release页"""
+        with self._lock:
+            repo_state = self._repos.get(repo_key)
+        return repo_state is None or time.time() - repo_state['full_scan_at'] >= self.full_scan_interval
+
+    def update(self, repo_key, releases, full_scan):
+        """保存仓库的release汇总
+
+        full_scan为False（遍历中途停止或失败）时保留上次完整遍历的时间；从未完整遍历过的仓库记为0，
+        下次运行仍会完整遍历，不会因为只获取了前几页就把更早的release当作已知而漏算下载数。
+        """
+        with self._lock:
+            old_state = self._repos.get(repo_key)
+            if full_scan:
+                full_scan_at = int(time.time())
+            else:
+                full_scan_at = old_state['full_scan_at'] if old_state is not None else 0
+            self._repos[repo_key] = {
+                'full_scan_at': full_scan_at,
+                'releases': [[release.id, release.tag_name, release.prerelease, release.downloads] for release in releases]
+            }
+
+    def save(self):
+        with self._lock, atomic_write(self.path) as f:
+            json.dump({'version': self.STATE_VERSION, 'repos': self._repos}, f, ensure_ascii=False, separators=(',', ':'))
+
+def is_transient_error(error):
+    """判断请求异常是否为暂时性错误（连接失败、超时、重试后仍为5xx）"""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.RetryError, requests.exceptions.ChunkedEncodingError)):
+        return True
+    # async引擎的httpx异常（只在已导入httpx时检查）
+    httpx = sys.modules.get('httpx')
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+class RepoCircuitBreaker:
+    """按仓库的熔断器
+
+    记录每个仓库连续失败的运行次数并持久化：暂时性错误和仓库不存在（404）都算一次失败，
+    同一次运行中无论失败多少个请求只计一次，成功处理后清零。
+    连续失败次数达到阈值后熔断器打开，冷却期内跳过该仓库的所有请求，插件保留上次的数据；
+    冷却期过后允许试探一次，失败则重新打开并加倍冷却期。
+    同一次运行中仓库出现暂时性错误后，该仓库之后的请求立即失败，由调用方推迟到运行结束时重试。
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, path, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN_HOURS * 3600,
+                 max_cooldown=BREAKER_MAX_COOLDOWN_HOURS * 3600):
+        self.path = path
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self._repos = {}
+        self._lock = Lock()
+        self._load()
+        self.begin_run()
+
+    @staticmethod
+    def repo_key(owner, repo):
+        return f'{owner}/{repo}'.lower()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("无法读取熔断器状态 %s，所有仓库按正常状态处理: %s", self.path, e)
+            return
+        if state.get('version') == self.STATE_VERSION:
+            self._repos = state.get('repos', {})
+
+    def begin_run(self):
+        """开始一次运行：确定处于打开状态的仓库，清除上次运行的记录（常驻模式下每次运行前调用）"""
+        now = time.time()
+        with self._lock:
+            self._open = {key for key, repo_state in self._repos.items()
+                          if now < repo_state['last_failure'] + self.cooldown_for(repo_state['failures'])}
+            self._attempted = set()  # 本次运行中发出过请求的仓库
+            self._counted = set()  # 本次运行中已计入失败次数的仓库
+            self._failed = {}  # 本次运行中出现暂时性错误的仓库 -> 错误信息
+            self._dead = set()  # 本次运行中不存在或无法访问的仓库
+            self._recovered = set()  # 出现暂时性错误但重试成功的仓库
+
+    def cooldown_for(self, failures):
+        """连续失败failures次后的冷却时间（秒），未达到阈值时为0"""
+        if failures < self.threshold:
+            return 0
+        return min(self.cooldown * 2 ** (failures - self.threshold), self.max_cooldown)
+
+    def is_open(self, owner, repo):
+        """仓库的熔断器是否处于打开状态（本次运行中跳过）"""
+        return self.repo_key(owner, repo) in self._open
+
+    def check(self, owner, repo):
+        """发出请求前检查仓库，熔断器打开或本次运行中已出现暂时性错误时抛出RepoUnavailable"""
+        key = self.repo_key(owner, repo)
+        if key in self._open:
+            with self._lock:
+                repo_state = self._repos[key]
+            retry_at = datetime.fromtimestamp(repo_state['last_failure'] + self.cooldown_for(repo_state['failures']),
+                                              BEIJING_TZ).strftime("%Y-%m-%d %H:%M")
+            raise RepoUnavailable(key, f"已连续失败 {repo_state['failures']} 次，熔断至 {retry_at}", circuit_open=True)
+        with self._lock:
+            self._attempted.add(key)
+            error = self._failed.get(key)
+        if error is not None:
+            raise RepoUnavailable(key, f"本次运行中无法访问: {error}")
+
+    def record_failure(self, owner, repo, error, transient=True):
+        """记录一次失败，返回对应的RepoUnavailable（仓库不存在时transient为False，不影响本次运行的其他请求）"""
+        key = self.repo_key(owner, repo)
+        # requests的异常信息包含完整的连接池描述，只记录异常类型
+        error = error if isinstance(error, str) else type(error).__name__
+        with self._lock:
+            if transient:
+                self._failed.setdefault(key, error)
+            else:
+                self._dead.add(key)
+            if key not in self._counted:
+                self._counted.add(key)
+                repo_state = self._repos.setdefault(key, {'failures': 0})
+                repo_state['failures'] += 1
+                repo_state['last_failure'] = int(time.time())
+                repo_state['last_error'] = error
+        return RepoUnavailable(key, f"无法访问: {error}")
+
+    def failed_repos(self):
+        """本次运行中出现暂时性错误的仓库"""
+        with self._lock:
+            return set(self._failed)
+
+    def reset_run(self):
+        """开始重试前清除本次运行中的暂时性错误，失败次数不会重复计入；重试成功的仓库在finish_run中清零"""
+        with self._lock:
+            self._attempted -= set(self._failed)
+            self._failed.clear()
+
+    def finish_run(self):
+        """本次运行中访问过且没有失败的仓库清零"""
+        with self._lock:
+            for key in self._attempted - set(self._failed) - self._dead:
+                if key in self._counted:
+                    self._recovered.add(key)
+                self._repos.pop(key, None)
+
+    def usage(self):
+        """本次运行的熔断统计（写入运行报告）"""
+        with self._lock:
+            return {
+                'skipped': sorted(self._open),
+                'failed': sorted(self._counted - self._recovered),
+                'recovered': sorted(self._recovered),
+                'open': sorted(key for key, repo_state in self._repos.items()
+                               if repo_state['failures'] >= self.threshold)
+            }
+
+    def report(self):
+        """输出本次运行的熔断情况"""
+        usage = self.usage()
+        if usage['skipped'] or usage['failed'] or usage['recovered']:
+            logger.info("熔断器: 跳过 %s 个仓库，本次失败 %s 个，重试成功 %s 个，处于熔断状态 %s 个",
+                        len(usage['skipped']), len(usage['failed']), len(usage['recovered']), len(usage['open']))
+        for key in usage['failed']:
+            repo_state = self._repos.get(key)
+            if repo_state is not None:
+                logger.info("  %s: 连续失败 %s 次，%s", key, repo_state['failures'], repo_state['last_error'])
+
+    def save(self):
+        with self._lock, atomic_write(self.path) as f:
+            json.dump({'version': self.STATE_VERSION, 'repos': self._repos}, f, ensure_ascii=False, separators=(',', ':'))
+
+@dataclass
+class RepoTree:
+    """分支文件树中与插件元数据相关的部分（/git/trees/{branch}?recursive=1）"""
+    plugin_json_paths: list = field(default_factory=list)  # 所有mcdreforged.plugin.json的路径
+    truncated: bool = False  # 文件过多时GitHub会截断返回的树
+
+def repo_api_url(owner, repo, path=''):
+    """仓库REST API地址"""
+    return f'{GITHUB_API_URL}/repos/{owner}/{repo}{path}'
+
+def raw_file_url(owner, repo, branch, path):
+    """仓库文件的raw地址"""
+    return f'{GITHUB_RAW_URL}/{owner}/{repo}/{quote(branch)}/{quote(path)}'
+
+def parse_repo_response(owner, repo, response):
+    """解析/repos/{owner}/{repo}的响应，仓库不存在或无法访问时返回None"""
+    if response.status_code != 200:
+        logger.warning("获取 %s/%s 的仓库信息失败: %s", owner, repo, response.status_code)
+        return None
     
-    if response.status_code == 404 and branch == 'main':
-        # 如果main分支不存在，尝试master分支
-        return get_file_content(session, owner, repo, path, 'master')
+    repo_data = response.json()
+    license_data = repo_data.get('license') or {}
+    return RepoInfo(
+        license=license_data.get('spdx_id'),
+        license_url=license_data.get('url'),
+        last_update_time=repo_data.get('pushed_at'),
+        stars=repo_data.get('stargazers_count', 0),
+        default_branch=repo_data.get('default_branch')
+    )
+
+def parse_tree_response(owner, repo, branch, response):
+    """解析/git/trees/{branch}?recursive=1的响应，分支不存在时返回None"""
+    # 404: 分支不存在；409: 空仓库
+    if response.status_code in (404, 409):
+        return None
+    if response.status_code != 200:
+        logger.warning("获取 %s/%s 分支 %s 的文件树失败: %s", owner, repo, branch, response.status_code)
+        return None
     
+    tree_data = response.json()
+    # 只保留插件元数据文件的路径，避免大仓库的完整文件树占用内存
+    return RepoTree(
+        plugin_json_paths=[item['path'] for item in tree_data.get('tree', [])
+                           if item.get('type') == 'blob' and posixpath.basename(item.get('path', '')) == 'mcdreforged.plugin.json'],
+        truncated=tree_data.get('truncated', False)
+    )
+
+def parse_tags_response(response):
+    """解析/tags的响应，请求失败时返回None"""
     if response.status_code != 200:
         return None
     
-    content = response.json()
-    if content.get('type') != 'file':
+    return [tag.get('name', '') for tag in response.json()]
+
+def parse_file_response(owner, repo, path, response):
+    """解析raw文件响应，返回文本内容，获取失败时返回None"""
+    if response.status_code != 200:
         return None
     
-    # 获取文件内容并解码
-    file_content = content.get('content', '')
-    import base64
     try:
-        decoded_content = base64.b64decode(file_content).decode('utf-8')
-        return decoded_content
-    except Exception as e:
-        print(f"解析 {owner}/{repo}/{path} 的内容失败: {e}")
+        return response.content.decode('utf-8')
+    except UnicodeDecodeError as e:
+        logger.warning("解析 %s/%s/%s 的内容失败: %s", owner, repo, path, e)
         return None
 
-def check_repo_exists(session, owner, repo):
-    """检查GitHub仓库是否存在
-    
-    Args:
-        session: 请求会话
-        owner: 仓库所有者
-        repo: 仓库名称
+def parse_release(release):
+    """解析/releases响应中的一项"""
+    assets = [ReleaseAsset(asset.get('name', ''), asset.get('download_count', 0))
+              for asset in release.get('assets', [])]
+    return Release(
+        tag_name=release.get('tag_name', ''),
+        prerelease=release.get('prerelease', False),
+        assets=assets,
+        id=release.get('id', 0),
+        downloads=count_asset_downloads(assets)
+    )
+
+class ReleaseScan:
+    """一个仓库的release分页遍历过程，与具体的HTTP实现无关（同步和异步引擎共用）
+
+    有汇总记录且未到完整遍历时间时，遇到一整页都是已知release就停止翻页，
+    更早的release使用汇总中保存的下载数
+
+    用法::
+
+        scan = ReleaseScan(release_state, owner, repo)
+        url = scan.first_url
+        while url:
+            url = scan.feed(get(url))
+        releases = scan.result()
+    """
+
+    def __init__(self, release_state, owner, repo):
+        self.release_state = release_state
+        self.owner = owner
+        self.repo = repo
+        self.repo_key = f'{owner}/{repo}'.lower()
+        self.state = release_state.get(self.repo_key) if release_state else None
+        self.full_scan = self.state is None or release_state.needs_full_scan(self.repo_key)
+        self.known_ids = {release.id for release in self.state[1]} if self.state else set()
+        self.first_url = repo_api_url(owner, repo, f'/releases?per_page={RELEASES_PAGE_SIZE}')
+        self.fresh = []
+        self.complete = False
+        self.failed = False
+
+    def feed(self, response):
+        """处理一页响应，返回下一页的URL，不需要继续翻页时返回None"""
+        if response.status_code != 200:
+            logger.warning("获取 %s/%s 的发布信息失败: %s", self.owner, self.repo, response.status_code)
+            # 中途失败时，未获取到的release使用汇总中的下载数
+            self.failed = not self.fresh
+            return None
         
-    Returns:
-        bool: 仓库是否存在并可访问
+        page = [parse_release(release) for release in response.json()]
+        self.fresh.extend(page)
+        url = response.links.get('next', {}).get('url')
+        if url is None:
+            self.complete = True
+        elif not self.full_scan and page and all(release.id in self.known_ids for release in page):
+            return None
+        return url
+
+    def result(self):
+        """合并本次获取的release与汇总记录，并更新汇总；第一页就失败时返回None"""
+        if self.failed:
+            return None
+        
+        if self.complete:
+            releases = self.fresh
+        else:
+            fresh_ids = {release.id for release in self.fresh}
+            releases = self.fresh + [release for release in (self.state[1] if self.state else [])
+                                     if release.id not in fresh_ids]
+        
+        if self.release_state is not None:
+            self.release_state.update(self.repo_key, releases, full_scan=self.complete)
+        
+        return releases
+
+class TagScan:
+    """一个仓库的标签分页遍历过程（同步和异步引擎共用），用法与ReleaseScan相同
+
+    monorepo的标签很多时，某个插件的标签可能不在第一页，因此按Link头遍历所有页
     """
-    url = f'https://api.github.com/repos/{owner}/{repo}'
-    try:
-        response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
-        return response.status_code == 200
-    except Exception as e:
-        print(f"检查仓库 {owner}/{repo} 是否存在时出错: {e}")
-        return False
 
-def find_plugin_json(session, owner, repo, branch='main', related_path=''):
-    """在仓库中查找mcdreforged.plugin.json文件"""
-    # 构建可能的插件文件路径
-    possible_paths = []
-    
-    # 如果有指定相关路径，优先检查
-    if related_path:
-        possible_paths.append(f'{related_path}/mcdreforged.plugin.json')
-    
-    # 添加其他可能的路径
-    possible_paths.extend([
-        'mcdreforged.plugin.json',
-        'src/mcdreforged.plugin.json',
-        'plugin/mcdreforged.plugin.json',
-        'plugins/mcdreforged.plugin.json'
-    ])
-    
-    for path in possible_paths:
-        content = get_file_content(session, owner, repo, path, branch)
-        if content:
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                print(f"无法解析 {owner}/{repo}/{path} 的JSON内容")
-                continue
-    
-    return None
+    def __init__(self, owner, repo):
+        self.owner = owner
+        self.repo = repo
+        self.first_url = repo_api_url(owner, repo, f'/tags?per_page={TAGS_PAGE_SIZE}')
+        self.tags = []
+        self.failed = False
+
+    def feed(self, response):
+        """处理一页响应，返回下一页的URL，没有下一页或请求失败时返回None"""
+        page = parse_tags_response(response)
+        if page is None:
+            if self.tags:
+                logger.warning("获取 %s/%s 的标签时中途失败: %s，只使用已获取的 %s 个标签",
+                               self.owner, self.repo, response.status_code, len(self.tags))
+            self.failed = not self.tags
+            return None
+        self.tags.extend(page)
+        return response.links.get('next', {}).get('url')
+
+    def result(self):
+        """所有标签名（按API顺序），第一页就失败时返回None"""
+        return None if self.failed else self.tags
+
+class RepoMetadataStore:
+    """单次运行内共享的仓库元数据层
+
+    每个 owner/repo 的每个端点在一次运行中最多请求一次，结果（包括异常）被缓存，
+    供 process_plugin 中的所有调用方以及共享同一仓库的其他插件复用。
+    多个线程同时请求同一仓库的同一端点时，只有一个线程真正发出请求，其余线程等待其结果。
+    """
+
+    def __init__(self, session, release_state=None, breaker=None):
+        self.session = session
+        self.release_state = release_state
+        self.breaker = breaker
+        self._futures = {}
+        self._gone = set()  # 返回404/410（确实不存在）的仓库
+        self._lock = Lock()
+
+    def _get(self, key, loader):
+        """获取指定键的结果，同一键只调用一次loader"""
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._futures[key] = future
+        
+        if is_owner:
+            try:
+                if self.breaker is not None:
+                    self.breaker.check(key[1], key[2])
+                value = loader()
+            except Exception as e:
+                future.set_exception(self._observe(key, exception=e))
+            else:
+                self._observe(key, value)
+                future.set_result(value)
+        
+        return future.result()
+
+    def _set(self, key, value=None, exception=None):
+        """直接写入指定键的结果（供预取引擎使用）"""
+        future = Future()
+        if exception is not None:
+            future.set_exception(self._observe(key, exception=exception))
+        else:
+            self._observe(key, value)
+            future.set_result(value)
+        with self._lock:
+            self._futures[key] = future
+
+    def _observe(self, key, value=None, exception=None):
+        """把结果告知熔断器，返回需要保存的异常（暂时性错误转换为RepoUnavailable）"""
+        if self.breaker is None:
+            return exception
+        owner, repo = key[1], key[2]
+        if exception is not None:
+            if is_transient_error(exception):
+                return self.breaker.record_failure(owner, repo, exception)
+            return exception
+        # 认证失败（401/403）、额度限制等与仓库本身无关，不计入熔断器，否则令牌失效时所有仓库都会被熔断
+        with self._lock:
+            gone = (owner, repo) in self._gone
+        if key[0] == 'repo' and value is None and gone:
+            self.breaker.record_failure(owner, repo, '仓库不存在', transient=False)
+        return None
+
+    def parse_repo(self, owner, repo, response):
+        """解析仓库信息响应（parse_repo_response），并记录确实不存在的仓库"""
+        if response.status_code in REPO_GONE_STATUSES:
+            self.mark_gone(owner, repo)
+        return parse_repo_response(owner, repo, response)
+
+    def mark_gone(self, owner, repo):
+        """记录仓库不存在（404/410），之后的空结果计入熔断器"""
+        with self._lock:
+            self._gone.add(self._repo_key(owner, repo))
+
+    @staticmethod
+    def _repo_key(owner, repo):
+        # GitHub的仓库名不区分大小写
+        return owner.lower(), repo.lower()
+
+    def get_repo(self, owner, repo):
+        """获取仓库基本信息，仓库不存在或无法访问时返回None"""
+        return self._get(('repo',) + self._repo_key(owner, repo), lambda: self._load_repo(owner, repo))
+
+    def get_releases(self, owner, repo):
+        """获取仓库的发布列表（按API顺序），请求失败时返回None"""
+        return self._get(('releases',) + self._repo_key(owner, repo), lambda: self._load_releases(owner, repo))
+
+    def get_tags(self, owner, repo):
+        """获取仓库的标签名列表（按API顺序），请求失败时返回None"""
+        return self._get(('tags',) + self._repo_key(owner, repo), lambda: self._load_tags(owner, repo))
+
+    def get_release_versions(self, owner, repo):
+        """获取仓库release标签的版本索引（TagVersionIndex），获取release失败时返回None"""
+        def load():
+            releases = self.get_releases(owner, repo)
+            if releases is None:
+                return None
+            return TagVersionIndex([(release.tag_name, release.prerelease) for release in releases])
+        return self._get(('release_versions',) + self._repo_key(owner, repo), load)
+
+    def get_tag_versions(self, owner, repo):
+        """获取仓库标签的版本索引（TagVersionIndex），获取标签失败时返回None"""
+        def load():
+            tags = self.get_tags(owner, repo)
+            return TagVersionIndex([(tag, False) for tag in tags]) if tags is not None else None
+        return self._get(('tag_versions',) + self._repo_key(owner, repo), load)
+
+    def get_tree(self, owner, repo, branch):
+        """获取分支的文件树，分支不存在时返回None"""
+        key = ('tree',) + self._repo_key(owner, repo) + (branch,)
+        return self._get(key, lambda: self._load_tree(owner, repo, branch))
+
+    def get_plugin_json(self, owner, repo, branch='main', related_path=''):
+        """获取仓库中的mcdreforged.plugin.json内容，找不到时返回None"""
+        key = ('plugin_json',) + self._repo_key(owner, repo) + (branch, related_path)
+        return self._get(key, lambda: find_plugin_json(self, owner, repo, branch, related_path))
+
+    def _load_repo(self, owner, repo):
+        response = self.session.get(repo_api_url(owner, repo))
+        return self.parse_repo(owner, repo, response)
+
+    def _load_tree(self, owner, repo, branch):
+        url = repo_api_url(owner, repo, f'/git/trees/{quote(branch, safe="")}?recursive=1')
+        response = self.session.get(url)
+        return parse_tree_response(owner, repo, branch, response)
+
+    def _load_releases(self, owner, repo):
+        scan = ReleaseScan(self.release_state, owner, repo)
+        url = scan.first_url
+        while url:
+            url = scan.feed(self.session.get(url))
+        return scan.result()
+
+    def _load_tags(self, owner, repo):
+        scan = TagScan(owner, repo)
+        url = scan.first_url
+        while url:
+            url = scan.feed(self.session.get(url))
+        return scan.result()
+
+def get_file_content(session, owner, repo, path, branch='main'):
+    """获取仓库中指定文件的内容（使用raw端点，无需base64解码）"""
+    response = session.get(raw_file_url(owner, repo, branch, path))
+    return parse_file_response(owner, repo, path, response)
+
+def check_repo_exists(repo_store, owner, repo):
+    """检查GitHub仓库是否存在
+    
+    Args:
+        repo_store: 仓库元数据层（RepoMetadataStore）
+        owner: 仓库所有者
+        repo: 仓库名称
+        
+    Returns:
+        bool: 仓库是否存在并可访问
+    """
+    try:
+        return repo_store.get_repo(owner, repo) is not None
+    except (RateLimitExhausted, RepoUnavailable):
+        raise
+    except Exception as e:
+        logger.warning("检查仓库 %s/%s 是否存在时出错: %s", owner, repo, e)
+        return False
+
+def plugin_json_paths(related_path=''):
+    """mcdreforged.plugin.json可能所在的路径（按优先级排列）"""
+    # 构建可能的插件文件路径
+    possible_paths = []
+    
+    # 如果有指定相关路径，优先检查
+    related_path = (related_path or '').strip('/')
+    if related_path:
+        possible_paths.append(f'{related_path}/mcdreforged.plugin.json')
+    
+    # 添加其他可能的路径
+    possible_paths.extend([
+        'mcdreforged.plugin.json',
+        'src/mcdreforged.plugin.json',
+        'plugin/mcdreforged.plugin.json',
+        'plugins/mcdreforged.plugin.json'
+    ])
+    return possible_paths
+
+def resolve_branch(repo_store, owner, repo, branch):
+    """确定实际使用的分支
+    
+    配置的分支不存在时使用仓库的默认分支
+    
+    Returns:
+        tuple: (分支名, RepoTree)，两个分支都不存在时文件树为None
+    """
+    tree = repo_store.get_tree(owner, repo, branch)
+    if tree is not None:
+        return branch, tree
+    
+    repo_info = repo_store.get_repo(owner, repo)
+    default_branch = repo_info.default_branch if repo_info else None
+    if default_branch and default_branch != branch:
+        logger.info("%s/%s 不存在分支 %s，使用默认分支 %s", owner, repo, branch, default_branch)
+        return default_branch, repo_store.get_tree(owner, repo, default_branch)
+    
+    return branch, None
+
+def locate_plugin_json(tree, related_path=''):
+    """在文件树中定位mcdreforged.plugin.json
+    
+    按plugin_json_paths的优先级查找；都不存在时，如果仓库中只有一个
+    mcdreforged.plugin.json则使用它
+    """
+    available = set(tree.plugin_json_paths)
+    for path in plugin_json_paths(related_path):
+        if path in available:
+            return path
+    
+    if len(tree.plugin_json_paths) == 1:
+        return tree.plugin_json_paths[0]
+    
+    return None
+
+def find_plugin_json(repo_store, owner, repo, branch='main', related_path=''):
+    """在仓库中查找mcdreforged.plugin.json文件
+    
+    先获取一次分支的文件树，在内存中定位文件后只下载该文件；
+    文件树被截断时才逐个尝试候选路径
+    """
+    branch, tree = resolve_branch(repo_store, owner, repo, branch)
+    if tree is None:
+        return None
+    
+    if tree.truncated:
+        paths = plugin_json_paths(related_path)
+    else:
+        path = locate_plugin_json(tree, related_path)
+        paths = [path] if path else []
+    
+    for path in paths:
+        content = get_file_content(repo_store.session, owner, repo, path, branch)
+        if content:
+            try:
+                return json.loads(content)
+            except json.JSONDecodeError:
+                logger.warning("无法解析 %s/%s/%s 的JSON内容", owner, repo, path)
+                continue
+    
+    return None
+
+def get_repo_info(repo_store, owner, repo):
+    """获取仓库的基本信息"""
+    repo_info = repo_store.get_repo(owner, repo)
+    if repo_info is None:
+        return {}
+    
+    return {
+        'license': repo_info.license,
+        'license_url': repo_info.license_url,
+        'last_update_time': repo_info.last_update_time,
+        'stars': repo_info.stars
+    }
+
+class TagVersionIndex:
+    """一个仓库中所有标签的版本索引
+
+    每个标签只解析一次，拆分出插件ID前缀和版本号，同一仓库中的多个插件（monorepo）共用。
+    选择版本时依次使用：带有该插件ID前缀的标签；没有前缀的标签；以release-等常用前缀开头的标签。
+    其他插件ID前缀的标签不会被选中。
+    在同一组标签中选择语义化版本最高的一个，而不是依赖API返回的顺序。
+
+    Args:
+        tags: [(标签名, 是否为预发布), ...]
+
+    >>> index = TagVersionIndex([('my_plugin-v1.2.0', False), ('my_plugin-v1.10.0', False), ('plugin2-v3.0', False),
+    ...                          ('other_plugin-v9.0', False), ('2024-01-01', False), ('2024-03-01', False)])
+    >>> sorted(index.prefixes)
+    ['my_plugin', 'other_plugin', 'plugin2']
+    >>> index.latest('my_plugin'), index.latest('plugin2')
+    ('1.10.0', '3.0')
+    >>> index.latest('single_plugin', allow_prerelease=True)
+    '2024-03-01'
+    """
+
+    def __init__(self, tags):
+        self.entries = []  # (前缀, 版本号, 排序键, 是否为预发布)
+        for tag_name, prerelease in tags:
+            match = TAG_VERSION_PATTERN.match(tag_name or '')
+            if not match:
+                continue
+            key = parse_version(match.group('version'))
+            # 版本号带有预发布标识（如1.0.0-beta）的标签也视为预发布
+            self.entries.append((match.group('prefix'), match.group('version'), key, prerelease or key[1] == 0))
+        self.prefixes = {entry[0] for entry in self.entries if entry[0] is not None}
+
+    def candidates(self, plugin_id=None):
+        """属于指定插件的标签"""
+        if plugin_id and plugin_id in self.prefixes:
+            return [entry for entry in self.entries if entry[0] == plugin_id]
+        unprefixed = [entry for entry in self.entries if entry[0] is None]
+        if unprefixed:
+            return unprefixed
+        return [entry for entry in self.entries if entry[0].lower() in RELEASE_TAG_PREFIXES]
+
+    def latest(self, plugin_id=None, allow_prerelease=False):
+        """指定插件的最高版本号，优先选择正式版本；allow_prerelease为False时不选择预发布版本"""
+        candidates = self.candidates(plugin_id)
+        stable = [entry for entry in candidates if not entry[3]]
+        if stable:
+            return max(stable, key=lambda entry: entry[2])[1]
+        if allow_prerelease and candidates:
+            return max(candidates, key=lambda entry: entry[2])[1]
+        return None
+
+def get_latest_version(repo_store, owner, repo, plugin_id=None):
+    """获取仓库的最新版本
+    
+    先从release中选择该插件版本号最高的正式版本，如果没有，则从tags中选择（没有正式版本时选择预发布版本），
+    都无法解析为版本号时按API顺序取第一个release或tag，如果都没有，则返回None
+    
+    支持的tag格式:
+    - <version>: 1.2.3
+    - v<version>: v1.2.3
+    - <plugin_id>-<version>: my_plugin-1.2.3
+    - <plugin_id>-v<version>: my_plugin-v1.2.3
+    """
+    # 首先从releases中选择非预发布的最高版本
+    release_versions = repo_store.get_release_versions(owner, repo)
+    if release_versions is not None:
+        version = release_versions.latest(plugin_id)
+        if version is not None:
+            return version
+        logger.debug("没有找到非预发布版本，尝试从tags中提取")
+    
+    # 如果没有找到有效的非预发布release，则从所有tags中选择
+    tag_versions = repo_store.get_tag_versions(owner, repo)
+    if tag_versions is not None:
+        version = tag_versions.latest(plugin_id, allow_prerelease=True)
+        if version is not None:
+            return version
+    
+    # 标签都不是版本号格式时，保留原来按API顺序选择的行为（已解析为其他插件版本的标签除外）
+    releases = repo_store.get_releases(owner, repo) or []
+    non_prerelease = [release.tag_name for release in releases
+                      if not release.prerelease and not TAG_VERSION_PATTERN.match(release.tag_name or '')]
+    if non_prerelease:
+        return extract_version_from_tag(non_prerelease[0], plugin_id)
+    tags = [tag for tag in repo_store.get_tags(owner, repo) or [] if not TAG_VERSION_PATTERN.match(tag)]
+    if tags:
+        return extract_version_from_tag(tags[0], plugin_id)
+    
+    return None
+
+def extract_version_from_tag(tag_name, plugin_id=None):
+    """从标签名中提取版本号
+    
+    支持的格式:
+    - <version>: 1.2.3
+    - v<version>: v1.2.3
+    - <plugin_id>-<version>: my_plugin-1.2.3
+    - <plugin_id>-v<version>: my_plugin-v1.2.3
+    """
+    if not tag_name:
+        return None
+    
+    # 判断是否包含插件id前缀
+    if plugin_id and tag_name.startswith(f"{plugin_id}-"):
+        # 移除插件id前缀
+        tag_name = tag_name[len(plugin_id)+1:]
+    
+    # 移除可能的v前缀
+    if tag_name.startswith('v'):
+        tag_name = tag_name[1:]
+    
+    # 尝试解析版本号（简单的数字和点号格式验证）
+    if PLAIN_VERSION_PATTERN.match(tag_name):
+        return tag_name
+    
+    # 如果以上格式都不匹配，尝试从标签名中查找版本号模式
+    match = VERSION_SEARCH_PATTERN.search(tag_name)
+    if match:
+        return match.group(1)
+    
+    return tag_name  # 如果无法解析，返回原始标签名
+
+def get_downloads_count(repo_store, owner, repo):
+    """获取仓库的下载次数（releases总和）
+    
+    只计算.mcdr和.pyz文件的下载次数
+    """
+    releases = repo_store.get_releases(owner, repo)
+    
+    if releases is None:
+        return 0
+    
+    total_downloads = 0
+    
+    for release in releases:
+        total_downloads += release.downloads
+        if release.downloads:
+            logger.debug("计算下载: %s = %s次", release.tag_name, release.downloads)
+    
+    logger.debug("总下载次数: %s", total_downloads)
+    return total_downloads
+
+def get_plugin_info_from_folder(plugin_folder):
+    """从插件文件夹中读取plugin_info.json"""
+    plugin_info_path = os.path.join(plugin_folder, 'plugin_info.json')
+    if not os.path.exists(plugin_info_path):
+        return None
+    
+    try:
+        with open(plugin_info_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning("读取插件信息文件失败: %s", e)
+        return None
+
+class GraphQLClient:
+    """GitHub GraphQL客户端，支持将响应录制到目录或从目录回放
+
+    录制文件以查询文本的SHA1命名，内容为查询及其响应，
+    回放时不访问网络，便于离线验证GraphQL模式的输出。
+    """
+
+    def __init__(self, session, fixtures_dir=None, record=False):
+        self.session = session
+        self.fixtures_dir = fixtures_dir
+        self.record = record
+        self.request_count = 0
+
+    def _fixture_path(self, query):
+        return os.path.join(self.fixtures_dir, hashlib.sha1(query.encode('utf-8')).hexdigest() + '.json')
+
+    def execute(self, query):
+        """执行查询，返回响应JSON（包含data和errors）"""
+        if self.fixtures_dir and not self.record:
+            fixture_path = self._fixture_path(query)
+            if not os.path.exists(fixture_path):
+                raise RuntimeError(f"没有找到GraphQL录制文件: {fixture_path}")
+            with open(fixture_path, 'r', encoding='utf-8') as f:
+                return json.load(f)['response']
+        
+        self.request_count += 1
+        response = self.session.post(f'{GITHUB_API_URL}/graphql', json={'query': query})
+        if response.status_code != 200:
+            raise RuntimeError(f"GraphQL请求失败: {response.status_code} {response.text[:200]}")
+        result = response.json()
+        
+        if self.fixtures_dir and self.record:
+            os.makedirs(self.fixtures_dir, exist_ok=True)
+            with open(self._fixture_path(query), 'w', encoding='utf-8') as f:
+                json.dump({'query': query, 'response': result}, f, ensure_ascii=False, indent=2)
+        
+        return result
+
+def build_graphql_batch_query(repos):
+    """构建一批仓库的GraphQL查询
+
+    Args:
+        repos: [(owner, repo, [分支名, ...], [对象表达式, ...]), ...]
+
+    Returns:
+        str: 每个仓库使用别名r<i>、每个分支使用别名b<k>、每个文件使用别名f<j>的查询文本
+    """
+    parts = []
+    for i, (owner, repo, branches, expressions) in enumerate(repos):
+        refs = ''.join(
+            f'\n    b{k}: ref(qualifiedName: {json.dumps("refs/heads/" + branch)}) {{ name }}'
+            for k, branch in enumerate(branches)
+        )
+        files = ''.join(
+            f'\n    f{j}: object(expression: {json.dumps(expression)}) {{ ... on Blob {{ text }} }}'
+            for j, expression in enumerate(expressions)
+        )
+        parts.append(
+            f'  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{\n'
+            f'    licenseInfo {{ key spdxId }}\n'
+            f'    pushedAt\n'
+            f'    stargazerCount\n'
+            f'    defaultBranchRef {{ name }}\n'
+            f'    releases(first: {RELEASES_PAGE_SIZE}, orderBy: {{field: CREATED_AT, direction: DESC}}) {{\n'
+            f'      nodes {{ databaseId tagName isPrerelease releaseAssets(first: 100) {{ nodes {{ name downloadCount }} }} }}\n'
+            f'      pageInfo {{ hasNextPage }}\n'
+            f'    }}\n'
+            f'    refs(refPrefix: "refs/tags/", first: {TAGS_PAGE_SIZE}, orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}) {{\n'
+            f'      nodes {{ name }}\n'
+            f'      pageInfo {{ hasNextPage }}\n'
+            f'    }}{refs}{files}\n'
+            f'  }}'
+        )
+    return 'query {\n' + '\n'.join(parts) + '\n}'
+
+def parse_graphql_repository(node):
+    """将GraphQL返回的仓库节点转换为与REST相同的数据结构
+
+    Returns:
+        tuple: (RepoInfo, [Release, ...], [tag名, ...])，release或tag超过一页时对应的项为None
+    """
+    license_data = node.get('licenseInfo') or {}
+    license_key = license_data.get('key')
+    repo_info = RepoInfo(
+        license=license_data.get('spdxId'),
+        # 与REST API返回的license.url保持一致
+        license_url=f'https://api.github.com/licenses/{license_key}' if license_key and license_key != 'other' else None,
+        last_update_time=node.get('pushedAt'),
+        stars=node.get('stargazerCount', 0),
+        default_branch=(node.get('defaultBranchRef') or {}).get('name')
+    )
+    releases = []
+    for release in (node.get('releases') or {}).get('nodes', []):
+        assets = [ReleaseAsset(asset.get('name', ''), asset.get('downloadCount', 0))
+                  for asset in (release.get('releaseAssets') or {}).get('nodes', [])]
+        releases.append(Release(
+            tag_name=release.get('tagName', ''),
+            prerelease=release.get('isPrerelease', False),
+            assets=assets,
+            id=release.get('databaseId', 0),
+            downloads=count_asset_downloads(assets)
+        ))
+    # release超过一页时交给REST按页获取（结合汇总记录增量更新）
+    if ((node.get('releases') or {}).get('pageInfo') or {}).get('hasNextPage'):
+        releases = None
+    tags = [tag.get('name', '') for tag in (node.get('refs') or {}).get('nodes', [])]
+    # tag超过一页时同样交给REST按页获取全部标签，避免monorepo中插件的标签不在第一页
+    if ((node.get('refs') or {}).get('pageInfo') or {}).get('hasNextPage'):
+        tags = None
+    return repo_info, releases, tags
+
+class GraphQLRepoStore(RepoMetadataStore):
+    """通过GraphQL批量预取仓库元数据的元数据层
+
+    prefetch会把所有仓库分批查询，每批一个请求，同时取回仓库信息、releases（含附件下载数）、
+    tags以及mcdreforged.plugin.json候选文件内容。之后process_plugin的所有查询都直接命中预取结果，
+    因此生成的插件数据与REST模式相同。未被预取或预取失败的仓库会回退到REST请求。
+    """
+
+    def __init__(self, session, client, batch_size=GRAPHQL_BATCH_SIZE, release_state=None, breaker=None):
+        super().__init__(session, release_state, breaker)
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self._branches = {}
+        self._blobs = {}
+
+    def prefetch(self, targets):
+        """批量预取仓库数据
+
+        每个仓库会查询配置分支是否存在，以及配置分支和默认分支（HEAD）上的候选文件
+
+        Args:
+            targets: [(owner, repo, branch, related_path), ...]
+        """
+        repos = {}
+        for owner, repo, branch, related_path in targets:
+            key = self._repo_key(owner, repo)
+            _, _, branches, expressions = repos.setdefault(key, (owner, repo, [], []))
+            if branch not in branches:
+                branches.append(branch)
+            for ref in (branch, 'HEAD'):
+                for path in plugin_json_paths(related_path):
+                    expression = f'{ref}:{path}'
+                    if expression not in expressions:
+                        expressions.append(expression)
+        
+        batch_list = [repos[key] for key in sorted(repos)]
+        for start in range(0, len(batch_list), self.batch_size):
+            batch = batch_list[start:start + self.batch_size]
+            try:
+                result = self.client.execute(build_graphql_batch_query(batch))
+            except Exception as e:
+                logger.warning("GraphQL批量查询失败，%s 个仓库将回退到REST: %s", len(batch), e)
+                continue
+            
+            not_found = {error['path'][0] for error in result.get('errors') or []
+                         if error.get('type') == 'NOT_FOUND' and error.get('path')}
+            other_errors = [error for error in result.get('errors') or [] if error.get('type') != 'NOT_FOUND']
+            if other_errors:
+                logger.warning("GraphQL查询返回错误: %s", other_errors[0].get('message'))
+            
+            data = result.get('data') or {}
+            for i, (owner, repo, branches, expressions) in enumerate(batch):
+                alias = f'r{i}'
+                node = data.get(alias)
+                key = self._repo_key(owner, repo)
+                if node is None:
+                    if alias in not_found:
+                        logger.warning("获取 %s/%s 的仓库信息失败: 404", owner, repo)
+                        self.mark_gone(owner, repo)
+                        self._set(('repo',) + key, None)
+                    continue
+                
+                repo_info, releases, tags = parse_graphql_repository(node)
+                self._set(('repo',) + key, repo_info)
+                if releases is not None:
+                    self._set(('releases',) + key, releases)
+                    if self.release_state is not None:
+                        self.release_state.update(f'{owner}/{repo}'.lower(), releases, full_scan=True)
+                if tags is not None:
+                    self._set(('tags',) + key, tags)
+                for k, branch in enumerate(branches):
+                    self._branches[key + (branch,)] = node.get(f'b{k}') is not None
+                for j, expression in enumerate(expressions):
+                    self._blobs[key + (expression,)] = (node.get(f'f{j}') or {}).get('text')
+        
+        logger.info("GraphQL预取完成: %s 个仓库，%s 次请求", len(repos), self.client.request_count)
+
+    def get_plugin_json(self, owner, repo, branch='main', related_path=''):
+        key = self._repo_key(owner, repo)
+        branch_exists = self._branches.get(key + (branch,))
+        if branch_exists is None:
+            return super().get_plugin_json(owner, repo, branch, related_path)
+        
+        # 配置的分支不存在时使用默认分支，与REST模式的resolve_branch一致
+        ref = branch if branch_exists else 'HEAD'
+        for path in plugin_json_paths(related_path):
+            content = self._blobs.get(key + (f'{ref}:{path}',))
+            if content:
+                try:
+                    return json.loads(content)
+                except json.JSONDecodeError:
+                    logger.warning("无法解析 %s/%s/%s 的JSON内容", owner, repo, path)
+        
+        # 候选路径之外的位置需要通过文件树查找
+        return super().get_plugin_json(owner, repo, branch, related_path)
+
+def get_rate_limit_wait(response):
+    """根据速率限制响应头计算需要等待的秒数，不需要等待时返回None
+    
+    同时处理次级速率限制（Retry-After）和主速率限制（X-RateLimit-Remaining为0时等到X-RateLimit-Reset）
+    """
+    backoff = get_secondary_rate_limit_backoff(response)
+    if backoff is not None:
+        return backoff
+    
+    if response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            reset_at = float(response.headers.get('X-RateLimit-Reset', 0))
+        except ValueError:
+            return float(SECONDARY_RATE_LIMIT_WAIT)
+        return max(reset_at - time.time(), 0) + 1
+    
+    return None
+
+class AsyncRepoPrefetcher:
+    """asyncio/httpx抓取引擎
+
+    使用一个连接池化的httpx.AsyncClient（安装了h2时启用HTTP/2）和全局信号量，
+    为所有插件并发预取REST模式下需要的全部数据（仓库信息、releases、tags、文件树、插件元数据文件），
+    写入RepoMetadataStore后再由process_plugin同步构建插件数据，因此输出与sync引擎完全一致。
+    同一端点的并发请求会合并为一个任务。
+    """
+
+    def __init__(self, repo_store, concurrency=ASYNC_CONCURRENCY, retry_count=RETRY_COUNT, timeout=TIMEOUT,
+                 cache=None, budget=None, metrics=None):
+        self.repo_store = repo_store
+        self.concurrency = max(1, concurrency)
+        self.retry_count = retry_count
+        self.timeout = timeout
+        self.cache = cache
+        self.budget = budget
+        self.metrics = metrics
+        self.request_count = 0
+        self._tasks = {}
+        self._resume_at = 0.0
+
+    def run(self, targets):
+        """预取所有目标仓库的数据
+
+        Args:
+            targets: [(owner, repo, branch, related_path), ...]
+        """
+        # 额度不足时只预取排在前面（最需要刷新）的插件
+        affordable = self.budget.affordable_plugins() if self.budget is not None else None
+        if affordable is not None and affordable < len(targets):
+            logger.warning("API额度预计只够预取 %s 个插件", affordable)
+            targets = targets[:affordable]
+        
+        import asyncio
+        asyncio.run(self._run(targets))
+        logger.info("async预取完成: %s 个插件，%s 次请求", len(targets), self.request_count)
+
+    async def _run(self, targets):
+        import asyncio
+        import httpx
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        session = self.repo_store.session
+        async with httpx.AsyncClient(http2=http2, timeout=self.timeout, verify=session.verify,
+                                     limits=limits, headers=session.api_headers, follow_redirects=True) as client:
+            self._client = client
+            await asyncio.gather(*(self._prefetch_target(*target) for target in targets))
+
+    async def _wait_for_rate_limit(self):
+        import asyncio
+        while True:
+            wait = self._resume_at - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _get(self, url):
+        """发送GET请求，处理速率限制、5xx重试和条件请求缓存"""
+        # 耗时从第一次拿到信号量开始计算，不包括在队列中等待的时间
+        timing = {'start': None}
+        try:
+            response, network_response, retries, cache_state = await self._cached_get(url, timing)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_request(url, None, time.perf_counter() - (timing['start'] or time.perf_counter()))
+            raise
+        
+        if self.metrics is not None:
+            self.metrics.record_request(url, network_response.status_code, time.perf_counter() - timing['start'],
+                                        len(network_response.content), retries, cache_state)
+        return response
+
+    async def _cached_get(self, url, timing):
+        """返回(返回给调用方的响应, 网络响应, 重试次数, 缓存状态)，第一次发出请求的时间写入timing['start']"""
+        import asyncio
+        cached = self.cache.lookup(url) if self.cache is not None else None
+        headers = ResponseCache.validators(cached[0]) if cached is not None else None
+        
+        for attempt in range(self.retry_count + 1):
+            await self._wait_for_rate_limit()
+            async with self._semaphore:
+                self.request_count += 1
+                if timing['start'] is None:
+                    timing['start'] = time.perf_counter()
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except Exception:
+                    if attempt == self.retry_count:
+                        raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+            
+            # 跟踪额度时，主速率限制耗尽直接停止（保留已有数据），不等待额度重置
+            if self.budget is not None and self.budget.observe(response) and \
+                    get_secondary_rate_limit_backoff(response) is None:
+                raise RateLimitExhausted(f"API额度已用完: {url}")
+            
+            wait = get_rate_limit_wait(response)
+            if wait is not None and attempt < self.retry_count:
+                logger.warning("触发速率限制，%.0f秒后重试: %s", wait, url)
+                self._resume_at = max(self._resume_at, time.monotonic() + wait)
+                continue
+            if response.status_code in (500, 502, 503, 504) and attempt < self.retry_count:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            break
+        
+        if self.cache is None:
+            return response, response, attempt, None
+        if response.status_code == 304 and cached is not None:
+            self.cache.hits += 1
+            self.cache.touch(url)
+            return self.cache.build_response(url, cached[0], cached[1], response), response, attempt, 'hit'
+        self.cache.misses += 1
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response, response, attempt, 'miss'
+
+    def _once(self, key, factory):
+        """同一键只创建一个任务，任务结果（或异常）同时写入RepoMetadataStore"""
+        import asyncio
+        task = self._tasks.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await factory()
+                except Exception as e:
+                    self.repo_store._set(key, exception=e)
+                    raise
+                self.repo_store._set(key, value)
+                return value
+            task = asyncio.ensure_future(run())
+            self._tasks[key] = task
+        return task
+
+    def _repo(self, owner, repo):
+        async def load():
+            return self.repo_store.parse_repo(owner, repo, await self._get(repo_api_url(owner, repo)))
+        return self._once(('repo',) + self.repo_store._repo_key(owner, repo), load)
+
+    def _releases(self, owner, repo):
+        async def load():
+            scan = ReleaseScan(self.repo_store.release_state, owner, repo)
+            url = scan.first_url
+            while url:
+                url = scan.feed(await self._get(url))
+            return scan.result()
+        return self._once(('releases',) + self.repo_store._repo_key(owner, repo), load)
+
+    def _tags(self, owner, repo):
+        async def load():
+            scan = TagScan(owner, repo)
+            url = scan.first_url
+            while url:
+                url = scan.feed(await self._get(url))
+            return scan.result()
+        return self._once(('tags',) + self.repo_store._repo_key(owner, repo), load)
+
+    def _tree(self, owner, repo, branch):
+        async def load():
+            url = repo_api_url(owner, repo, f'/git/trees/{quote(branch, safe="")}?recursive=1')
+            return parse_tree_response(owner, repo, branch, await self._get(url))
+        return self._once(('tree',) + self.repo_store._repo_key(owner, repo) + (branch,), load)
+
+    def _plugin_json(self, owner, repo, branch, related_path):
+        async def load():
+            # 与find_plugin_json相同的查找逻辑
+            resolved_branch, tree = branch, await self._tree(owner, repo, branch)
+            if tree is None:
+                repo_info = await self._repo(owner, repo)
+                default_branch = repo_info.default_branch if repo_info else None
+                if default_branch and default_branch != branch:
+                    resolved_branch, tree = default_branch, await self._tree(owner, repo, default_branch)
+            if tree is None:
+                return None
+            
+            if tree.truncated:
+                paths = plugin_json_paths(related_path)
+            else:
+                path = locate_plugin_json(tree, related_path)
+                paths = [path] if path else []
+            
+            for path in paths:
+                response = await self._get(raw_file_url(owner, repo, resolved_branch, path))
+                content = parse_file_response(owner, repo, path, response)
+                if content:
+                    try:
+                        return json.loads(content)
+                    except json.JSONDecodeError:
+                        logger.warning("无法解析 %s/%s/%s 的JSON内容", owner, repo, path)
+            return None
+        return self._once(('plugin_json',) + self.repo_store._repo_key(owner, repo) + (branch, related_path), load)
+
+    async def _prefetch_target(self, owner, repo, branch, related_path):
+        import asyncio
+        # 额度不足时不再预取，由scan_plugins跳过剩余插件
+        if self.budget is not None and not self.budget.can_afford():
+            return
+        try:
+            if await self._repo(owner, repo) is None:
+                return
+            releases, _ = await asyncio.gather(self._releases(owner, repo),
+                                               self._plugin_json(owner, repo, branch, related_path))
+            # 与get_latest_version一致：没有正式release时才需要tags
+            if releases is None or all(release.prerelease for release in releases):
+                await self._tags(owner, repo)
+        except Exception as e:
+            # 异常已写入RepoMetadataStore，由process_plugin按原有逻辑处理
+            logger.warning("预取 %s/%s 时出错: %s", owner, repo, e)
+
+def collect_repo_targets(plugin_folders):
+    """读取插件的plugin_info.json，返回需要查询的仓库列表
+
+    Returns:
+        list: [(owner, repo, branch, related_path), ...]
+    """
+    targets = []
+    for plugin_folder in plugin_folders:
+        local_info = get_plugin_info_from_folder(plugin_folder)
+        if not local_info:
+            continue
+        owner, repo = parse_github_url(local_info.get('repository'))
+        if owner and repo:
+            targets.append((owner, repo, local_info.get('branch', 'main'), local_info.get('related_path', '')))
+    return targets
+
+class PluginCatalogue:
+    """内存中的插件目录，按插件ID索引
+
+    每次运行只从plugins.json加载一次，供所有插件查询已有数据，并用于合并新数据。
+    条目保持原有顺序，新插件追加到末尾。
+    """
+
+    def __init__(self, plugins=None, checked_at=None):
+        self._plugins = {}
+        for plugin in plugins or []:
+            self._plugins[plugin.get('id')] = plugin
+        # 插件ID -> 最近一次处理的时间戳；内容没有变化时plugins.json不会重写，其中的更新时间也不会刷新
+        self.checked_at = checked_at or {}
+
+    @classmethod
+    def load(cls, plugins_json_path, state_path=None):
+        """从plugins.json加载插件目录，文件不存在或无法解析时返回空目录
+
+        Args:
+            plugins_json_path: plugins.json路径
+            state_path: 保存每个插件最近处理时间的文件，为None时不加载
+        """
+        checked_at = {}
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    checked_at = json.load(f).get('checked_at', {})
+            except (OSError, ValueError, AttributeError):
+                logger.warning("无法读取 %s，忽略", state_path)
+        
+        if not os.path.exists(plugins_json_path):
+            return cls(checked_at=checked_at)
+        
+        with open(plugins_json_path, 'r', encoding='utf-8') as f:
+            try:
+                plugins = json.load(f)
+            except json.JSONDecodeError:
+                logger.warning("无法解析 %s，将创建新文件", plugins_json_path)
+                return cls(checked_at=checked_at)
+        
+        if not isinstance(plugins, list):
+            logger.warning("%s 格式不正确，将创建新文件", plugins_json_path)
+            return cls(checked_at=checked_at)
+        
+        return cls(plugins, checked_at)
+
+    def save_state(self, state_path):
+        """保存每个插件最近一次处理的时间"""
+        with atomic_write(state_path) as f:
+            json.dump({'checked_at': self.checked_at}, f, ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, plugin_id):
+        """获取指定插件的已有数据，不存在时返回空字典"""
+        return self._plugins.get(plugin_id) or {}
+
+    def update(self, plugin_data):
+        """更新或添加单个插件的数据"""
+        self._plugins[plugin_data.get('id')] = plugin_data
+
+    def merge(self, plugins):
+        """批量更新或添加插件数据，并记录处理时间"""
+        now = int(time.time())
+        for plugin_data in plugins:
+            self.update(plugin_data)
+            self.checked_at[plugin_data.get('id')] = now
+
+    def refreshed_at(self, plugin_id):
+        """插件数据最近一次刷新的时间戳"""
+        return max(self.get(plugin_id).get('update_time_timestamp') or 0, self.checked_at.get(plugin_id, 0))
+
+    def to_list(self):
+        """按目录顺序返回所有插件数据"""
+        return list(self._plugins.values())
+
+    def remove(self, plugin_ids):
+        """从目录中移除指定的插件"""
+        for plugin_id in plugin_ids:
+            self._plugins.pop(plugin_id, None)
+            self.checked_at.pop(plugin_id, None)
+
+    def snapshot(self):
+        """当前所有插件数据的浅拷贝（插件ID -> 插件数据），用于与之后的数据比较"""
+        return dict(self._plugins)
+
+    def __contains__(self, plugin_id):
+        return plugin_id in self._plugins
+
+    def __len__(self):
+        return len(self._plugins)
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """原子写入文件：先写入同目录的临时文件，完整写入并同步到磁盘后再替换目标文件
+
+    写入中途出错时目标文件保持不变，读取方不会看到只写了一半的文件。
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_plugin_shards(plugins, shard_dir):
+    """把每个插件单独写入shard_dir/<插件ID>.json，并生成索引文件
+
+    索引按目录顺序列出每个插件的ID、最新版本、分片的SHA256和大小，客户端可以只获取需要的或有变化的插件。
+    内容未变化的分片不重写，目录中已不存在的插件的分片会被删除。
+
+    Returns:
+        int: 本次重写的分片数
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    entries = []
+    shard_names = set()
+    written = 0
+    for plugin in plugins:
+        plugin_id = plugin.get('id')
+        # 插件ID会用作文件名，只接受安全的字符
+        if not isinstance(plugin_id, str) or not SHARD_ID_PATTERN.match(plugin_id):
+            logger.warning("插件ID %r 不能用作文件名，跳过分片", plugin_id)
+            continue
+        
+        content = json.dumps(plugin, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        shard_name = f'{plugin_id}.json'
+        shard_path = os.path.join(shard_dir, shard_name)
+        shard_names.add(shard_name)
+        try:
+            with open(shard_path, 'rb') as f:
+                unchanged = f.read() == content
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            with atomic_write(shard_path, 'wb') as f:
+                f.write(content)
+            written += 1
+        
+        entries.append({
+            'id': plugin_id,
+            'latest_version': plugin.get('latest_version'),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'size': len(content)
+        })
+    
+    for name in os.listdir(shard_dir):
+        if name.endswith('.json') and name != SHARD_INDEX_NAME and name not in shard_names:
+            os.remove(os.path.join(shard_dir, name))
+    
+    # 索引最后写入，读取方看到的索引总是指向已经写好的分片
+    with atomic_write(os.path.join(shard_dir, SHARD_INDEX_NAME)) as f:
+        json.dump({'count': len(entries), 'generated_at': get_beijing_time()['timestamp'], 'plugins': entries},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    return written
+
+def search_tokens(text):
+    """将文本切分为搜索词：拉丁字母和数字按单词切分，CJK文字没有分隔符，切分为单字和相邻两字
+
+    插件页面（data/index.html）用相同的规则切分查询，两边需要保持一致。
+    """
+    tokens = set()
+    for cjk, word in SEARCH_TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if word:
+            tokens.add(word)
+            continue
+        tokens.update(cjk)
+        tokens.update(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+def build_search_index(plugins, content_hash):
+    """构建插件页面使用的倒排索引
+
+    terms将搜索词映射到插件序号（即插件在ids中的位置）的升序列表，
+    覆盖插件名称、ID、各语言的描述、作者和标签；labels是每个标签对应的插件序号。
+    页面在词表中查找包含查询中拉丁单词（任意位置）的词，对CJK文字匹配单字和相邻两字，各个词的结果取交集，
+    不需要遍历每个插件；结果与页面在索引不可用时逐个插件做子串匹配相同。
+    """
+    terms, labels = {}, {}
+    for doc, plugin in enumerate(plugins):
+        description = plugin.get('description') or {}
+        fields = [plugin.get('id') or '', plugin.get('name') or '']
+        fields.extend(description.values() if isinstance(description, dict) else [str(description)])
+        fields.extend(author.get('name') or '' for author in plugin.get('authors') or [] if isinstance(author, dict))
+        fields.extend(plugin.get('labels') or [])
+        
+        tokens = set()
+        for text in fields:
+            if isinstance(text, str):
+                tokens.update(search_tokens(text))
+        for token in tokens:
+            terms.setdefault(token, []).append(doc)
+        for label in plugin.get('labels') or []:
+            postings = labels.setdefault(label, [])
+            if not postings or postings[-1] != doc:
+                postings.append(doc)
+    
+    return {
+        'sha256': content_hash,
+        'ids': [plugin.get('id') for plugin in plugins],
+        'terms': dict(sorted(terms.items())),
+        'labels': dict(sorted(labels.items()))
+    }
+
+def prerelease_key(prerelease):
+    """预发布标识的排序键：数字标识按数值比较且小于字母标识"""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in prerelease.split('.'))
+
+def parse_version(text):
+    """解析语义化版本号，返回可比较的排序键，无法解析时返回None
+
+    末尾的0不影响比较（1.2 == 1.2.0），预发布版本小于对应的正式版本，构建元数据被忽略。
+    """
+    match = VERSION_PATTERN.match(str(text or '').strip())
+    if not match:
+        return None
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    while release and release[-1] == 0:
+        release = release[:-1]
+    prerelease = match.group(2)
+    return (release, 0, prerelease_key(prerelease)) if prerelease else (release, 1, ())
+
+class VersionRequirement:
+    """MCDReforged插件元数据中的版本要求
+
+    由空格分隔的多个条件组成，需要同时满足。条件由运算符（>=、<=、>、<、=、^、~，省略时为=）和版本组成，
+    版本的组成部分可以是通配符x或*，通配符之后的部分不参与比较。
+    ^要求主版本号相同，~要求主版本号和次版本号相同。无法解析时抛出ValueError。
+    """
+
+    def __init__(self, requirement):
+        self.text = str(requirement or '').strip()
+        self.criteria = []
+        for criterion in self.text.split():
+            if criterion == '*':
+                continue
+            match = REQUIREMENT_PATTERN.match(criterion)
+            if not match:
+                raise ValueError(f"无法解析版本要求: {self.text}")
+            operator, base, prerelease = match.groups()
+            parts = base.split('.')
+            wildcard = next((i for i, part in enumerate(parts) if not part.isdigit()), None)
+            release = tuple(int(part) for part in parts[:wildcard])
+            self.criteria.append((operator or '=', release, wildcard is not None, prerelease))
+
+    @staticmethod
+    def component(release, index):
+        return release[index] if index < len(release) else 0
+
+    def compare(self, key, release, wildcard, prerelease):
+        """比较版本与条件中的版本，返回-1、0或1"""
+        if wildcard:
+            length = len(release)
+            current = tuple(self.component(key[0], i) for i in range(length))
+            return (current > release) - (current < release)
+        
+        while release and release[-1] == 0:
+            release = release[:-1]
+        base = (release, 0, prerelease_key(prerelease)) if prerelease else (release, 1, ())
+        return (key > base) - (key < base)
+
+    def matches(self, version):
+        """版本是否满足要求，版本无法解析时返回False"""
+        key = parse_version(version)
+        if key is None:
+            return not self.criteria
+        
+        for operator, release, wildcard, prerelease in self.criteria:
+            result = self.compare(key, release, wildcard, prerelease)
+            if operator == '^':
+                satisfied = result >= 0 and self.component(key[0], 0) == self.component(release, 0)
+            elif operator == '~':
+                satisfied = result >= 0 and all(self.component(key[0], i) == self.component(release, i)
+                                                for i in range(2))
+            else:
+                satisfied = {'>=': result >= 0, '<=': result <= 0, '>': result > 0, '<': result < 0,
+                             '=': result == 0, '==': result == 0}[operator]
+            if not satisfied:
+                return False
+        return True
+
+def resolve_dependencies(plugins):
+    """解析所有插件之间的依赖关系，为每个插件生成安装计划
+
+    依赖图以插件的dependencies为边，依赖项的版本取其latest_version（无法解析时使用version），
+    依次检查依赖项是否存在于目录中、版本是否满足要求，以及是否存在循环依赖。
+    安装计划是插件及其所有（传递）依赖的拓扑顺序，依赖项在前、插件本身在最后，
+    客户端按顺序安装即可，不需要再查询目录解析版本要求。
+
+    Returns:
+        dict: 插件ID -> 解析结果（installable、plan、requires、missing、unsatisfied、cycles）
+    """
+    index = {plugin.get('id'): plugin for plugin in plugins}
+    
+    def available_version(plugin):
+        latest = plugin.get('latest_version')
+        return latest if parse_version(latest) is not None else plugin.get('version')
+    
+    def dependencies(plugin_id):
+        dependencies = index[plugin_id].get('dependencies')
+        return sorted(dependencies.items()) if isinstance(dependencies, dict) else []
+    
+    results = {}
+    for root in index:
+        plan, requires, missing, unsatisfied, cycles = [], {}, [], [], []
+        done, stack = set(), []
+        
+        def visit(plugin_id):
+            if plugin_id in stack:
+                cycles.append(stack[stack.index(plugin_id):] + [plugin_id])
+                return
+            if plugin_id in done:
+                return
+            
+            stack.append(plugin_id)
+            for dependency, requirement in dependencies(plugin_id):
+                requirement = str(requirement or '*')
+                if dependency in PLATFORM_DEPENDENCIES:
+                    conditions = requires.setdefault(dependency, [])
+                    if requirement not in conditions:
+                        conditions.append(requirement)
+                    continue
+                if dependency not in index:
+                    missing.append({'id': dependency, 'requirement': requirement, 'required_by': plugin_id})
+                    continue
+                
+                version = available_version(index[dependency])
+                try:
+                    satisfied = VersionRequirement(requirement).matches(version)
+                except ValueError:
+                    satisfied = False
+                if not satisfied:
+                    unsatisfied.append({'id': dependency, 'requirement': requirement, 'version': version,
+                                        'required_by': plugin_id})
+                    continue
+                visit(dependency)
+            stack.pop()
+            done.add(plugin_id)
+            plan.append({'id': plugin_id, 'version': available_version(index[plugin_id])})
+        
+        visit(root)
+        results[root] = {
+            'installable': not (missing or unsatisfied or cycles),
+            'plan': plan,
+            'requires': {name: ' '.join(conditions) for name, conditions in requires.items()},
+            'missing': missing,
+            'unsatisfied': unsatisfied,
+            'cycles': cycles
+        }
+    return results
+
+def catalogue_hash(plugins):
+    """插件目录内容的SHA256（不包括每次处理都会变化的数据更新时间）"""
+    digest = hashlib.sha256()
+    for plugin in plugins:
+        content = {key: value for key, value in plugin.items() if key not in VOLATILE_FIELDS}
+        digest.update(json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+def write_catalogue(plugins, plugins_json_path, shard_dir=None):
+    """写入plugins.json、它的gzip/brotli压缩版本、搜索索引、依赖解析结果、分片（可选）和plugins.meta.json
+
+    plugins.meta.json记录内容哈希、插件数和生成时间，客户端可以先获取这个小文件，哈希不变时跳过下载。
+    内容哈希与上次生成的相同且文件齐全时不重写任何文件，发布分支也就不会产生新的提交。
+    brotli为可选依赖，未安装时不生成.br文件。
+
+    Returns:
+        bool: 是否写入了新内容
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    
+    directory = os.path.dirname(plugins_json_path)
+    meta_path = os.path.join(directory, CATALOGUE_META_NAME)
+    content_hash = catalogue_hash(plugins)
+    search_index_path = os.path.join(directory, SEARCH_INDEX_NAME)
+    dependencies_path = os.path.join(directory, DEPENDENCIES_NAME)
+    outputs = [plugins_json_path, plugins_json_path + '.gz', search_index_path, dependencies_path]
+    if brotli is not None:
+        outputs.append(plugins_json_path + '.br')
+    if shard_dir is not None:
+        outputs.append(os.path.join(shard_dir, SHARD_INDEX_NAME))
+    
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            previous_hash = json.load(f).get('sha256')
+    except (OSError, ValueError, AttributeError):
+        previous_hash = None
+    if previous_hash == content_hash and all(os.path.exists(path) for path in outputs):
+        logger.info("插件目录内容没有变化（%s），保留现有文件", content_hash[:12])
+        return False
+    
+    data = json.dumps(plugins, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    variants = {plugins_json_path: data, plugins_json_path + '.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[plugins_json_path + '.br'] = brotli.compress(data, quality=11)
+    elif os.path.exists(plugins_json_path + '.br'):
+        # 不再生成的.br文件会过期，直接删除
+        os.remove(plugins_json_path + '.br')
+    variants[search_index_path] = json.dumps(build_search_index(plugins, content_hash), ensure_ascii=False,
+                                             separators=(',', ':')).encode('utf-8')
+    resolution = resolve_dependencies(plugins)
+    broken = sorted(plugin_id for plugin_id, result in resolution.items() if not result['installable'])
+    if broken:
+        logger.warning("依赖解析: %s 个插件存在缺失、版本不满足或循环的依赖: %s",
+                       len(broken), ', '.join(map(str, broken)))
+    variants[dependencies_path] = json.dumps({'sha256': content_hash, 'plugins': resolution}, ensure_ascii=False,
+                                             separators=(',', ':')).encode('utf-8')
+    for path, content in variants.items():
+        with atomic_write(path, 'wb') as f:
+            f.write(content)
+    
+    if shard_dir is not None:
+        written = write_plugin_shards(plugins, shard_dir)
+        logger.info("已写入插件分片 %s，更新 %s 个", shard_dir, written)
+    
+    # 元数据最后写入，读取方看到新哈希时其他文件已经更新
+    now = get_beijing_time()
+    with atomic_write(meta_path) as f:
+        json.dump({
+            'sha256': content_hash,
+            'count': len(plugins),
+            'generated_time': now['formatted'],
+            'generated_time_timestamp': now['timestamp'],
+            'files': {os.path.basename(path): len(content) for path, content in variants.items()}
+        }, f, ensure_ascii=False, indent=2)
+    return True
+
+def diff_catalogue(previous, current):
+    """比较两次运行之间的插件目录
+
+    Args:
+        previous: 上次的插件数据，插件ID -> 插件数据
+        current: 本次的插件数据，插件ID -> 插件数据
+
+    Returns:
+        dict | None: 变更集（新增、移除、最新版本变化、许可证变化、下载量变化），没有变化时返回None
+    """
+    changes = {'added': [], 'removed': [], 'versions': [], 'licenses': [], 'downloads': []}
+    for plugin_id, plugin in current.items():
+        old = previous.get(plugin_id)
+        if old is None:
+            changes['added'].append({'id': plugin_id, 'name': plugin.get('name', plugin_id),
+                                     'version': plugin.get('latest_version'), 'url': plugin.get('repository_url')})
+            continue
+        
+        if old.get('latest_version') != plugin.get('latest_version'):
+            changes['versions'].append({'id': plugin_id, 'name': plugin.get('name', plugin_id),
+                                        'from': old.get('latest_version'), 'to': plugin.get('latest_version'),
+                                        'url': plugin.get('repository_url')})
+        if old.get('license') != plugin.get('license'):
+            changes['licenses'].append({'id': plugin_id, 'from': old.get('license'), 'to': plugin.get('license')})
+        old_downloads, downloads = old.get('downloads') or 0, plugin.get('downloads') or 0
+        if old_downloads != downloads:
+            changes['downloads'].append({'id': plugin_id, 'downloads': downloads, 'delta': downloads - old_downloads})
+    
+    for plugin_id, old in previous.items():
+        if plugin_id not in current:
+            changes['removed'].append({'id': plugin_id, 'name': old.get('name', plugin_id)})
+    
+    if not any(changes.values()):
+        return None
+    return changes
+
+class ChangeFeed:
+    """插件目录的变更记录（changes.json）及其Atom订阅源
+
+    每次运行的变更作为一个带递增序号的变更集追加到末尾，只保留最近window个。
+    客户端记住上次看到的序号，之后只需读取序号更大的变更集；
+    上次的序号小于保留的最早序号减一时说明错过了部分变更，需要重新获取完整的plugins.json。
+    """
+
+    ATOM_ENTRY_LIMIT = 100  # Atom订阅源中最多包含的条目数
+    ATOM_NAMESPACE = 'http://www.w3.org/2005/Atom'
+
+    def __init__(self, path, window=CHANGES_WINDOW):
+        self.path = path
+        self.window = max(1, window)
+        self.latest_seq = 0
+        self.changes = []
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.latest_seq = data.get('latest_seq', 0)
+                self.changes = data.get('changes', [])
+            except (OSError, ValueError, AttributeError):
+                logger.warning("无法读取 %s，将重新开始记录变更", path)
+
+    def append(self, changeset):
+        """追加一个变更集，返回分配的序号"""
+        now = get_beijing_time()
+        self.latest_seq += 1
+        self.changes.append({'seq': self.latest_seq, 'time': now['formatted'], 'timestamp': now['timestamp'],
+                             **changeset})
+        del self.changes[:-self.window]
+        return self.latest_seq
+
+    def save(self):
+        """写入changes.json"""
+        with atomic_write(self.path) as f:
+            json.dump({
+                'latest_seq': self.latest_seq,
+                'oldest_seq': self.changes[0]['seq'] if self.changes else self.latest_seq + 1,
+                'changes': self.changes
+            }, f, ensure_ascii=False, separators=(',', ':'))
+
+    def _atom_entries(self):
+        """按时间倒序生成Atom条目：(序号, 条目序号, 时间戳, 标题, 链接)；下载量变化太频繁，不放入订阅源"""
+        for changeset in reversed(self.changes):
+            events = []
+            for item in changeset.get('added', []):
+                events.append((f"新插件 {item['name']} {item.get('version') or ''}".strip(), item.get('url')))
+            for item in changeset.get('versions', []):
+                events.append((f"{item['name']} 更新到 {item['to']}（原 {item['from']}）", item.get('url')))
+            for item in changeset.get('licenses', []):
+                events.append((f"{item['id']} 的许可证从 {item['from'] or '无'} 变更为 {item['to'] or '无'}", None))
+            for item in changeset.get('removed', []):
+                events.append((f"{item['name']} 已从插件目录中移除", None))
+            for index, (title, link) in enumerate(events):
+                yield changeset['seq'], index, changeset['timestamp'], title, link
+
+    def write_atom(self, path, site_url=SITE_URL):
+        """写入Atom订阅源"""
+        import xml.etree.ElementTree as ET
+        ns = self.ATOM_NAMESPACE
+        ET.register_namespace('', ns)
+        
+        def timestamp_text(timestamp):
+            return datetime.fromtimestamp(timestamp, BEIJING_TZ).isoformat()
+        
+        feed = ET.Element(f'{{{ns}}}feed')
+        ET.SubElement(feed, f'{{{ns}}}id').text = f'{site_url}/{os.path.basename(path)}'
+        ET.SubElement(feed, f'{{{ns}}}title').text = 'MCDReforged 插件目录更新'
+        ET.SubElement(feed, f'{{{ns}}}updated').text = timestamp_text(
+            self.changes[-1]['timestamp'] if self.changes else 0)
+        ET.SubElement(feed, f'{{{ns}}}link', href=f'{site_url}/{os.path.basename(path)}', rel='self')
+        ET.SubElement(feed, f'{{{ns}}}link', href=f'{site_url}/')
+        ET.SubElement(ET.SubElement(feed, f'{{{ns}}}author'), f'{{{ns}}}name').text = 'Plugin-Catalogue'
+        
+        for count, (seq, index, timestamp, title, link) in enumerate(self._atom_entries()):
+            if count >= self.ATOM_ENTRY_LIMIT:
+                break
+            entry = ET.SubElement(feed, f'{{{ns}}}entry')
+            ET.SubElement(entry, f'{{{ns}}}id').text = f'{site_url}/changes.json#{seq}-{index}'
+            ET.SubElement(entry, f'{{{ns}}}title').text = title
+            ET.SubElement(entry, f'{{{ns}}}updated').text = timestamp_text(timestamp)
+            if link:
+                ET.SubElement(entry, f'{{{ns}}}link', href=link)
+        
+        with atomic_write(path, 'wb') as f:
+            ET.ElementTree(feed).write(f, encoding='utf-8', xml_declaration=True)
+
+class HistoryStore:
+    """下载量、星标数和最新版本的历史快照（数据目录下的history/）
+
+    每天一个分区（daily/YYYY-MM-DD.json），按列存储当天最后一次运行时所有插件的数据：
+    ids、downloads、stars、latest_version为等长数组，同一插件在各数组中的位置相同。
+    同一天多次运行时覆盖当天的分区，之前的分区不再修改。
+    超过daily_days天的每日分区压缩为每月一个分区（monthly/YYYY-MM.json，保留该月最后一份快照），
+    超过retention_months个月的月度分区被删除，因此历史数据的总量有上限。
+    index.json列出所有分区，静态托管时客户端可以据此获取历史数据。
+    """
+
+    FORMAT_VERSION = 1
+    INDEX_NAME = "index.json"
+
+    def __init__(self, path, daily_days=HISTORY_DAILY_DAYS, retention_months=HISTORY_RETENTION_MONTHS):
+        self.path = path
+        self.daily_days = max(max(HISTORY_TREND_WINDOWS), daily_days)
+        self.retention_months = max(1, retention_months)
+        self._loaded = {}  # 分区路径 -> 按插件ID索引的快照；除当天的分区外内容不再变化，常驻模式下只需读取一次
+
+    def _daily_path(self, day):
+        return os.path.join(self.path, 'daily', f'{day.isoformat()}.json')
+
+    def _monthly_path(self, month):
+        return os.path.join(self.path, 'monthly', f'{month}.json')
+
+    def _list(self, kind, pattern):
+        directory = os.path.join(self.path, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory)
+                      if name.endswith('.json') and re.match(pattern, name[:-5]))
+
+    def daily_dates(self):
+        """所有每日分区的日期（升序）"""
+        return [date.fromisoformat(name) for name in self._list('daily', r'^\d{4}-\d{2}-\d{2}$')]
+
+    def months(self):
+        """所有月度分区的月份（YYYY-MM，升序）"""
+        return self._list('monthly', r'^\d{4}-\d{2}$')
+
+    def _read(self, path):
+        """读取一个分区，返回(快照日期, 插件ID -> (下载量, 星标数, 最新版本))，无法读取时返回None"""
+        if path in self._loaded:
+            return self._loaded[path]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rows = dict(zip(data['ids'], zip(data['downloads'], data['stars'], data['latest_version'])))
+            partition = (date.fromisoformat(data['date']), rows)
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("无法读取历史快照 %s，忽略", path)
+            partition = None
+        self._loaded[path] = partition
+        return partition
+
+    def _write(self, path, day, plugins):
+        # 不记录写入时间：数据没有变化时分区内容不变，工作流不会因此向meta分支提交
+        with atomic_write(path) as f:
+            json.dump({
+                'version': self.FORMAT_VERSION,
+                'date': day.isoformat(),
+                'ids': [plugin.get('id') for plugin in plugins],
+                'downloads': [plugin.get('downloads') or 0 for plugin in plugins],
+                'stars': [plugin.get('stars') or 0 for plugin in plugins],
+                'latest_version': [plugin.get('latest_version') for plugin in plugins]
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        self._loaded.pop(path, None)
+
+    def record(self, plugins, today):
+        """写入当天的快照（覆盖当天已有的快照）"""
+        self._write(self._daily_path(today), today, plugins)
+
+    def snapshot_at(self, day):
+        """day当天或之前最近的一份快照（插件ID -> (下载量, 星标数, 最新版本)），没有时返回None"""
+        for candidate in reversed(self.daily_dates()):
+            if candidate <= day:
+                partition = self._read(self._daily_path(candidate))
+                if partition is not None:
+                    return partition[1]
+        for month in reversed(self.months()):
+            if month <= day.strftime('%Y-%m'):
+                partition = self._read(self._monthly_path(month))
+                if partition is not None and partition[0] <= day:
+                    return partition[1]
+        return None
+
+    def trends(self, plugins, today):
+        """计算每个插件的下载量/星标数在7天和30天内的增量以及趋势排名
+
+        增量与窗口开始时（或之前最近）的快照比较，没有足够早的快照或插件当时还不存在时为None。
+        趋势排名按7天下载量增量从高到低排列（相同时比较7天星标增量），第1名为最热门，没有增量的插件不参与排名。
+
+        Returns:
+            dict: 插件ID -> trend字段
+        """
+        baselines = {days: self.snapshot_at(today - timedelta(days=days)) for days in HISTORY_TREND_WINDOWS}
+        trends = {}
+        for plugin in plugins:
+            plugin_id = plugin.get('id')
+            rows = {days: baseline.get(plugin_id) if baseline else None for days, baseline in baselines.items()}
+            trend = {}
+            for column, field_name in enumerate(('downloads', 'stars')):
+                for days, row in rows.items():
+                    trend[f'{field_name}_{days}d'] = (plugin.get(field_name) or 0) - row[column] if row else None
+            trend['rank'] = None
+            trends[plugin_id] = trend
+        
+        window = HISTORY_TREND_WINDOWS[0]
+        ranked = sorted((trend for trend in trends.values() if trend[f'downloads_{window}d'] is not None),
+                        key=lambda trend: (trend[f'downloads_{window}d'], trend[f'stars_{window}d']), reverse=True)
+        for rank, trend in enumerate(ranked, 1):
+            trend['rank'] = rank
+        return trends
+
+    def compact(self, today):
+        """将超过daily_days天的每日分区合并到月度分区，删除超过保留期的月度分区，并更新index.json"""
+        cutoff = today - timedelta(days=self.daily_days)
+        for day in self.daily_dates():
+            if day >= cutoff:
+                break
+            daily_path = self._daily_path(day)
+            monthly_path = self._monthly_path(day.strftime('%Y-%m'))
+            # 日期升序处理，每月最后一份快照最后写入；月度分区中已有更晚的快照时不覆盖
+            monthly = self._read(monthly_path) if os.path.exists(monthly_path) else None
+            if monthly is None or monthly[0] <= day:
+                os.makedirs(os.path.dirname(monthly_path), exist_ok=True)
+                os.replace(daily_path, monthly_path)
+                self._loaded.pop(monthly_path, None)
+            else:
+                os.remove(daily_path)
+            self._loaded.pop(daily_path, None)
+        
+        oldest_month = today.year * 12 + today.month - self.retention_months
+        for month in self.months():
+            year, month_number = map(int, month.split('-'))
+            if year * 12 + month_number <= oldest_month:
+                path = self._monthly_path(month)
+                os.remove(path)
+                self._loaded.pop(path, None)
+        
+        self.write_index()
 
-def get_repo_info(session, owner, repo):
-    """获取仓库的基本信息"""
-    url = f'https://api.github.com/repos/{owner}/{repo}'
-    response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
-    
-    if response.status_code != 200:
-        print(f"获取 {owner}/{repo} 的仓库信息失败: {response.status_code}")
-        return {}
-    
-    repo_data = response.json()
-    license_data = repo_data.get('license') or {}
-    return {
-        'license': license_data.get('spdx_id'),  # 使用SPDX ID（缩写形式）
-        'license_url': license_data.get('url'),
-        'last_update_time': repo_data.get('pushed_at'),
-        'stars': repo_data.get('stargazers_count', 0)
-    }
+    def write_index(self):
+        """写入index.json，列出所有分区（相对于历史目录的路径，按时间升序）"""
+        index = {
+            'version': self.FORMAT_VERSION,
+            'monthly': [f'monthly/{month}.json' for month in self.months()],
+            'daily': [f'daily/{day.isoformat()}.json' for day in self.daily_dates()]
+        }
+        with atomic_write(os.path.join(self.path, self.INDEX_NAME)) as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
 
-def get_latest_version(session, owner, repo, plugin_id=None):
-    """获取仓库的最新版本
-    
-    先尝试获取最新的正式release（非pre-release），如果没有，则获取最新的tag
-    如果都没有，则返回None
-    
-    支持的tag格式:
-    - <version>: 1.2.3
-    - v<version>: v1.2.3
-    - <plugin_id>-<version>: my_plugin-1.2.3
-    - <plugin_id>-v<version>: my_plugin-v1.2.3
+class ReadmeSanitizer(HTMLParser):
+    """按白名单清理渲染后的README HTML，并把相对链接改写为仓库中的地址
+
+    只保留排版相关的标签和属性，script、style、iframe等标签连同内容一起删除，
+    链接只允许http(s)和mailto；图片等资源指向raw文件，其他相对链接指向GitHub上的文件页面，
+    页内锚点加上GitHub渲染标题时使用的user-content-前缀。
+
+    自闭合的删除标签没有结束标签，只跳过该标签本身，不影响之后的内容:
+
+    >>> sanitizer = ReadmeSanitizer('owner', 'repo', 'main', 'README.md')
+    >>> sanitizer.feed('<p>a</p><svg/><script/><iframe/><p>b</p><img src="x.png"/>')
+    >>> sanitizer.result()
+    '<p>a</p><p>b</p><img src="https://raw.githubusercontent.com/owner/repo/main/x.png">'
     """
-    # 首先获取所有非预发布的releases
-    url = f'https://api.github.com/repos/{owner}/{repo}/releases'
-    response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
-    
-    if response.status_code == 200:
-        releases = response.json()
-        # 过滤掉预发布版本
-        non_prerelease = [r for r in releases if not r.get('prerelease', False)]
+
+    ALLOWED_TAGS = {
+        'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'dd', 'del', 'details', 'div', 'dl', 'dt', 'em',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'ol', 'p', 'picture', 'pre',
+        'q', 's', 'samp', 'source', 'span', 'strike', 'strong', 'sub', 'summary', 'sup', 'table', 'tbody',
+        'td', 'tfoot', 'th', 'thead', 'tr', 'tt', 'ul', 'var'
+    }
+    DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math',
+                    'form', 'textarea', 'select', 'title', 'head'}  # 连同内容一起删除
+    VOID_TAGS = {'br', 'hr', 'img', 'source'}
+    COMMON_ATTRIBUTES = {'id', 'class', 'title', 'align', 'lang', 'dir', 'aria-hidden'}
+    TAG_ATTRIBUTES = {
+        'a': {'href', 'name'},
+        'img': {'src', 'alt', 'width', 'height'},
+        'source': {'srcset', 'media', 'type'},
+        'td': {'colspan', 'rowspan'},
+        'th': {'colspan', 'rowspan'},
+        'ol': {'start', 'type'},
+        'details': {'open'}
+    }
+    SAFE_SCHEMES = ('http', 'https', 'mailto')
+
+    def __init__(self, owner, repo, branch, readme_path):
+        super().__init__(convert_charrefs=True)
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.base_dir = posixpath.dirname(readme_path)
+        self.output = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def rewrite_url(self, url, resource):
+        """改写链接，不安全的链接返回None
+
+        Args:
+            resource: 是否为图片等资源（指向raw文件），否则指向GitHub上的文件页面
+        """
+        url = url.strip()
+        if url.startswith('#'):
+            return url if url.startswith('#user-content-') else f'#user-content-{url[1:]}'
+        parsed = urlparse(url)
+        if parsed.scheme or parsed.netloc:
+            return url if parsed.scheme in self.SAFE_SCHEMES else None
         
-        if non_prerelease:
-            # 获取最新的非预发布版本
-            latest_release = non_prerelease[0]
-            tag_name = latest_release.get('tag_name', '')
-            version = extract_version_from_tag(tag_name, plugin_id)
-            return version
-        else:
-            print(f"没有找到非预发布版本，尝试从tags中提取")
-    else:
-        print(f"获取 {owner}/{repo} 的发布信息失败: {response.status_code}")
-    
-    # 如果没有找到有效的非预发布release，则获取所有tags
-    url = f'https://api.github.com/repos/{owner}/{repo}/tags'
-    response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
-    
-    if response.status_code == 200:
-        tags = response.json()
-        if tags:
-            latest_tag = tags[0]
-            tag_name = latest_tag.get('name', '')
-            version = extract_version_from_tag(tag_name, plugin_id)
-            return version
-    
-    return None
+        # 以/开头的路径相对于仓库根目录，其他相对于README所在目录；不允许跳出仓库
+        path = parsed.path.lstrip('/') if parsed.path.startswith('/') else posixpath.join(self.base_dir, parsed.path)
+        path = posixpath.normpath(path) if path else ''
+        while path.startswith('../'):
+            path = path[3:]
+        path = '' if path in ('.', '..') else path
+        suffix = (f'?{parsed.query}' if parsed.query else '') + (f'#{parsed.fragment}' if parsed.fragment else '')
+        if resource:
+            return f'https://raw.githubusercontent.com/{self.owner}/{self.repo}/{self.branch}/{path}{suffix}'
+        return f'https://github.com/{self.owner}/{self.repo}/blob/{self.branch}/{path}{suffix}'
 
-def extract_version_from_tag(tag_name, plugin_id=None):
-    """从标签名中提取版本号
-    
-    支持的格式:
-    - <version>: 1.2.3
-    - v<version>: v1.2.3
-    - <plugin_id>-<version>: my_plugin-1.2.3
-    - <plugin_id>-v<version>: my_plugin-v1.2.3
+    def handle_starttag(self, tag, attrs):
+        if tag in self.DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in self.ALLOWED_TAGS:
+            return
+        
+        allowed = self.COMMON_ATTRIBUTES | self.TAG_ATTRIBUTES.get(tag, set())
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            value = value or ''
+            if name in ('href', 'src'):
+                value = self.rewrite_url(value, resource=(name == 'src'))
+            elif name == 'srcset':
+                candidates = [candidate.strip().split(None, 1) for candidate in value.split(',') if candidate.strip()]
+                urls = [self.rewrite_url(candidate[0], resource=True) for candidate in candidates]
+                value = None if None in urls else ', '.join(
+                    ' '.join([url] + candidate[1:]) for url, candidate in zip(urls, candidates))
+            if value is None:
+                continue
+            parts.append(f'{name}="{html.escape(value, quote=True)}"')
+        if tag == 'a':
+            parts.append('rel="nofollow noopener"')
+        
+        self.output.append(f'<{" ".join(parts)}>')
+        if tag not in self.VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # 自闭合的标签不会有对应的结束标签，删除的标签直接跳过，不改变dropping的深度
+        if tag in self.DROPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.DROPPED_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # 关闭未闭合的内层标签，保证输出的标签成对
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.output.append(html.escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        return ''.join(self.output) + ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+
+def split_readme_url(readme_url):
+    """从readme_url（raw地址）中拆分出(owner, repo, branch, path)，格式不正确时返回None
+
+    分支名包含/时会被拆到path中，拼接出的地址不变，不影响链接改写。
     """
-    if not tag_name:
+    parts = unquote(urlparse(readme_url or '').path).lstrip('/').split('/', 3)
+    if len(parts) != 4 or not all(parts):
         return None
+    return tuple(parts)
+
+def render_markdown(session, text, owner, repo):
+    """使用GitHub的Markdown API（GFM）渲染README，失败时返回None"""
+    response = session.post(f'{GITHUB_API_URL}/markdown', json={'text': text, 'mode': 'gfm', 'context': f'{owner}/{repo}'})
+    if response.status_code != 200:
+        logger.warning("渲染 %s/%s 的README失败: %s", owner, repo, response.status_code)
+        return None
+    return response.content.decode('utf-8', errors='replace')
+
+def read_readme_source_hash(path):
+    """读取已镜像的README文件首行记录的源文件地址和SHA256"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            match = README_SOURCE_PATTERN.match(f.readline())
+    except OSError:
+        return None
+    return match.groups() if match else None
+
+def mirror_readme(session, plugin, readme_dir, budget=None):
+    """获取插件的README，源文件有变化时重新渲染并写入readme_dir/<插件ID>.html
+
+    源文件的地址和SHA256记录在输出文件首行的注释中，两者都没有变化时不重新渲染；
+    配合响应缓存时，未变化的README通过条件请求获取（304）。
+
+    Returns:
+        bool: 镜像文件是否存在（获取或渲染失败时保留之前的文件）
+    """
+    plugin_id = plugin.get('id')
+    output_path = os.path.join(readme_dir, f'{plugin_id}.html')
+    source = split_readme_url(plugin.get('readme_url'))
+    if source is None:
+        return os.path.exists(output_path)
     
-    # 判断是否包含插件id前缀
-    if plugin_id and tag_name.startswith(f"{plugin_id}-"):
-        # 移除插件id前缀
-        tag_name = tag_name[len(plugin_id)+1:]
-    
-    # 移除可能的v前缀
-    if tag_name.startswith('v'):
-        tag_name = tag_name[1:]
+    owner, repo, branch, path = source
+    response = session.get(raw_file_url(owner, repo, branch, path))
+    text = parse_file_response(owner, repo, path, response)
+    if text is None:
+        return os.path.exists(output_path)
     
-    # 尝试解析版本号（简单的数字和点号格式验证）
-    if re.match(r'^\d+(\.\d+)*$', tag_name):
-        return tag_name
+    source_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if read_readme_source_hash(output_path) == (plugin['readme_url'], source_hash):
+        return True
     
-    # 如果以上格式都不匹配，尝试从标签名中查找版本号模式
-    match = re.search(r'(\d+\.\d+(\.\d+)*)', tag_name)
-    if match:
-        return match.group(1)
+    if path.lower().endswith(('.md', '.markdown')):
+        if budget is not None and not budget.can_afford():
+            logger.warning("API额度不足，跳过渲染 %s 的README", plugin_id)
+            return os.path.exists(output_path)
+        rendered = render_markdown(session, text, owner, repo)
+        if rendered is None:
+            return os.path.exists(output_path)
+    else:
+        rendered = f'<pre>{html.escape(text, quote=False)}</pre>'
     
-    return tag_name  # 如果无法解析，返回原始标签名
+    sanitizer = ReadmeSanitizer(owner, repo, branch, path)
+    sanitizer.feed(rendered)
+    with atomic_write(output_path) as f:
+        f.write(f'<!-- {plugin["readme_url"]} {source_hash} -->\n')
+        f.write(f'<article class="markdown-body">{sanitizer.result()}</article>\n')
+    logger.debug("已镜像 %s 的README", plugin_id)
+    return True
 
-def get_downloads_count(session, owner, repo):
-    """获取仓库的下载次数（releases总和）
-    
-    只计算.mcdr和.pyz文件的下载次数
+def mirror_readmes(plugins, readme_dir, session, workers=1, budget=None):
+    """镜像所有插件的README，并删除已不在目录中的插件的镜像文件
+
+    Returns:
+        set: 存在镜像文件的插件ID
     """
-    url = f'https://api.github.com/repos/{owner}/{repo}/releases'
-    response = session.get(url, headers=HEADERS, verify=SSL_VERIFY)
-    
-    if response.status_code != 200:
-        print(f"获取 {owner}/{repo} 的发布信息失败: {response.status_code}")
-        return 0
+    targets = [plugin for plugin in plugins if SHARD_ID_PATTERN.match(str(plugin.get('id')))]
+    mirrored = set()
     
-    releases = response.json()
-    total_downloads = 0
+    def mirror(plugin):
+        try:
+            return mirror_readme(session, plugin, readme_dir, budget)
+        except RateLimitExhausted:
+            return os.path.exists(os.path.join(readme_dir, f'{plugin["id"]}.html'))
+        except Exception as e:
+            logger.warning("镜像 %s 的README时出错: %s", plugin['id'], e)
+            return os.path.exists(os.path.join(readme_dir, f'{plugin["id"]}.html'))
     
-    for release in releases:
-        for asset in release.get('assets', []):
-            asset_name = asset.get('name', '').lower()
-            # 只计算.mcdr和.pyz文件的下载次数
-            if asset_name.endswith('.mcdr') or asset_name.endswith('.pyz'):
-                download_count = asset.get('download_count', 0)
-                total_downloads += download_count
-                print(f"计算下载: {asset_name} = {download_count}次")
-    
-    print(f"总下载次数: {total_downloads}")
-    return total_downloads
-
-def get_plugin_info_from_folder(plugin_folder):
-    """从插件文件夹中读取plugin_info.json"""
-    plugin_info_path = os.path.join(plugin_folder, 'plugin_info.json')
-    if not os.path.exists(plugin_info_path):
-        return None
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for plugin, exists in zip(targets, executor.map(mirror, targets)):
+            if exists:
+                mirrored.add(plugin['id'])
     
-    try:
-        with open(plugin_info_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"读取插件信息文件失败: {e}")
-        return None
+    expected = {f'{plugin["id"]}.html' for plugin in targets}
+    for name in os.listdir(readme_dir) if os.path.isdir(readme_dir) else []:
+        if name.endswith('.html') and name not in expected:
+            os.remove(os.path.join(readme_dir, name))
+    return mirrored
 
 def resolve_readme_path(related_path, readme_path):
     """解析README路径，相对于related_path"""
-    print(f"解析README路径: related_path={related_path}, readme_path={readme_path}")
+    logger.debug("解析README路径: related_path=%s, readme_path=%s", related_path, readme_path)
     
     if not readme_path:
-        print(f"没有指定README路径，使用默认路径: README.md")
+        logger.debug("没有指定README路径，使用默认路径: README.md")
         return "README.md"  # 默认为根目录的README.md
     
     # 使用posixpath处理路径，确保使用/而不是\
@@ -317,50 +3248,46 @@ def resolve_readme_path(related_path, readme_path):
         if readme_path.startswith("../") or readme_path.startswith("./"):
             # 组合路径并规范化
             full_path = posixpath.normpath(posixpath.join(related_path, readme_path))
-            print(f"路径组合结果: {full_path}")
+            logger.debug("路径组合结果: %s", full_path)
             if full_path.startswith("/"):
                 full_path = full_path[1:]  # 移除开头的/
-                print(f"移除开头的/: {full_path}")
+                logger.debug("移除开头的/: %s", full_path)
             return full_path
     
     # 如果readme_path不是相对路径，或者没有related_path
-    print(f"返回原始路径: {readme_path}")
+    logger.debug("返回原始路径: %s", readme_path)
     return readme_path
 
-def process_plugin(plugin_folder, session):
-    """处理单个插件文件夹，获取并更新插件信息"""
+def process_plugin(plugin_folder, repo_store, catalogue=None):
+    """处理单个插件文件夹，获取并更新插件信息
+    
+    Args:
+        plugin_folder: 插件文件夹路径
+        repo_store: 仓库元数据层（RepoMetadataStore）
+        catalogue: 已有的插件目录（PluginCatalogue），用于获取插件的已有数据
+    """
     try:
         plugin_id = os.path.basename(plugin_folder)
-        print(f"\n=============== 处理插件: {plugin_id} ===============")
+        logger.debug("=============== 处理插件: %s ===============", plugin_id)
         
         # 从插件文件夹获取信息
         local_info = get_plugin_info_from_folder(plugin_folder)
         if not local_info:
-            print(f"插件 {plugin_id} 没有找到plugin_info.json文件，跳过")
+            logger.warning("插件 %s 没有找到plugin_info.json文件，跳过", plugin_id)
             return None
         
-        # 加载现有的插件信息（如果存在）
-        existing_data = {}
-        if os.path.exists(PLUGINS_JSON_PATH):
-            with open(PLUGINS_JSON_PATH, 'r', encoding='utf-8') as f:
-                try:
-                    plugins_data = json.load(f)
-                    for plugin in plugins_data:
-                        if plugin.get('id') == plugin_id:
-                            existing_data = plugin
-                            break
-                except json.JSONDecodeError:
-                    print(f"无法解析 {PLUGINS_JSON_PATH}，将使用空数据")
+        # 获取现有的插件信息（如果存在）
+        existing_data = catalogue.get(plugin_id) if catalogue is not None else {}
         
         # 获取仓库信息
         repository_url = local_info.get('repository')
         if not repository_url:
-            print(f"插件 {plugin_id} 没有仓库URL信息，跳过")
+            logger.warning("插件 %s 没有仓库URL信息，跳过", plugin_id)
             return None
         
         owner, repo = parse_github_url(repository_url)
         if not owner or not repo:
-            print(f"插件 {plugin_id} 的仓库URL格式不正确: {repository_url}")
+            logger.warning("插件 %s 的仓库URL格式不正确: %s", plugin_id, repository_url)
             return None
         
         branch = local_info.get('branch', 'main')
@@ -368,10 +3295,11 @@ def process_plugin(plugin_folder, session):
         
         # 验证仓库是否存在
         # 先检查仓库是否存在
-        repo_exists = check_repo_exists(session, owner, repo)
+        repo_exists = check_repo_exists(repo_store, owner, repo)
         if not repo_exists:
-            print(f"仓库 {owner}/{repo} 不存在或无法访问，使用本地信息构建最小数据")
-            # 构建一个最小的插件信息
+            logger.warning("仓库 %s/%s 不存在或无法访问，使用本地信息构建最小数据", owner, repo)
+            # 构建一个最小的插件信息（字段格式与正常处理时相同）
+            current_time = get_beijing_time()
             return {
                 'id': plugin_id,
                 'name': local_info.get('name', plugin_id),
@@ -380,20 +3308,23 @@ def process_plugin(plugin_folder, session):
                 'dependencies': {},
                 'labels': local_info.get('labels', []),
                 'repository_url': repository_url,
-                'update_time': get_beijing_time(),
+                'update_time': current_time['formatted'],
+                'update_time_timestamp': current_time['timestamp'],
                 'latest_version': existing_data.get('latest_version', '0.0.0'),
                 'license': existing_data.get('license'),
                 'license_url': existing_data.get('license_url'),
                 'downloads': existing_data.get('downloads', 0),
+                'stars': existing_data.get('stars', 0),
                 'readme_url': f'https://raw.githubusercontent.com/{owner}/{repo}/{branch}/README.md',
                 'last_update_time': existing_data.get('last_update_time'),
+                'last_update_time_timestamp': existing_data.get('last_update_time_timestamp', 0),
                 'authors': local_info.get('authors', [])
             }
         
         # 获取插件信息
-        plugin_info = find_plugin_json(session, owner, repo, branch, related_path)
+        plugin_info = repo_store.get_plugin_json(owner, repo, branch, related_path)
         if not plugin_info:
-            print(f"无法获取插件 {plugin_id} 的信息，尝试使用现有数据")
+            logger.warning("无法获取插件 %s 的信息，尝试使用现有数据", plugin_id)
             # 如果没有从GitHub获取到插件信息，则构建一个最小的插件信息集
             plugin_info = {
                 'id': plugin_id,
@@ -407,9 +3338,11 @@ def process_plugin(plugin_folder, session):
         
         # 获取仓库信息 - 可能会失败，使用默认值或现有值
         try:
-            repo_info = get_repo_info(session, owner, repo) or {}
+            repo_info = get_repo_info(repo_store, owner, repo) or {}
+        except (RateLimitExhausted, RepoUnavailable):
+            raise
         except Exception as e:
-            print(f"获取仓库信息失败: {e}")
+            logger.warning("获取仓库信息失败: %s", e)
             repo_info = {}
         
         # 获取当前时间
@@ -417,18 +3350,22 @@ def process_plugin(plugin_folder, session):
         
         # 获取下载次数 - 可能会失败，使用默认值或现有值
         try:
-            downloads = get_downloads_count(session, owner, repo)
+            downloads = get_downloads_count(repo_store, owner, repo)
+        except (RateLimitExhausted, RepoUnavailable):
+            raise
         except Exception as e:
-            print(f"获取下载次数失败: {e}")
+            logger.warning("获取下载次数失败: %s", e)
             downloads = existing_data.get('downloads', 0)
         
         # 获取最新版本号 - 可能会失败，使用默认值或现有值
         try:
-            latest_version = get_latest_version(session, owner, repo, actual_plugin_id)
+            latest_version = get_latest_version(repo_store, owner, repo, actual_plugin_id)
             if not latest_version:
                 latest_version = plugin_info.get('version', existing_data.get('latest_version', '0.0.0'))
+        except (RateLimitExhausted, RepoUnavailable):
+            raise
         except Exception as e:
-            print(f"获取最新版本失败: {e}")
+            logger.warning("获取最新版本失败: %s", e)
             latest_version = plugin_info.get('version', existing_data.get('latest_version', '0.0.0'))
         
         # 处理README路径
@@ -441,10 +3378,10 @@ def process_plugin(plugin_folder, session):
             else:
                 readme_path = intro
         
-        print(f"原始README路径: {readme_path}")
+        logger.debug("原始README路径: %s", readme_path)
         resolved_readme_path = resolve_readme_path(related_path, readme_path) or "README.md"
         readme_url = f'https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{resolved_readme_path}'
-        print(f"最终README URL: {readme_url}")
+        logger.debug("最终README URL: %s", readme_url)
         
         # 构建插件数据
         plugin_data = {
@@ -461,6 +3398,7 @@ def process_plugin(plugin_folder, session):
             'license': repo_info.get('license', existing_data.get('license')),
             'license_url': repo_info.get('license_url', existing_data.get('license_url')),
             'downloads': downloads if downloads > 0 else existing_data.get('downloads', 0),
+            'stars': repo_info.get('stars', existing_data.get('stars', 0)),
             'readme_url': readme_url,
             'last_update_time': repo_info.get('last_update_time', existing_data.get('last_update_time')),
             'last_update_time_timestamp': int(datetime.fromisoformat(repo_info.get('last_update_time', '1970-01-01T00:00:00Z').replace('Z', '+00:00')).timestamp()) if repo_info.get('last_update_time') else existing_data.get('last_update_time_timestamp', 0)
@@ -490,10 +3428,12 @@ def process_plugin(plugin_folder, session):
         
         return plugin_data
     
+    except (RateLimitExhausted, RepoUnavailable):
+        # 额度耗尽或仓库暂时无法访问时不构建最小数据，由调用方保留已有数据（或稍后重试）
+        raise
     except Exception as e:
-        import traceback
-        print(f"处理插件 {os.path.basename(plugin_folder)} 时出错: {e}")
-        print(traceback.format_exc())  # 打印完整的堆栈跟踪
+        # 附带完整的堆栈跟踪
+        logger.error("处理插件 %s 时出错: %s", os.path.basename(plugin_folder), e, exc_info=True)
         
         # 尝试构建一个最小的数据集
         try:
@@ -514,6 +3454,7 @@ def process_plugin(plugin_folder, session):
                 'update_time_timestamp': current_time['timestamp'],
                 'latest_version': '0.0.0',
                 'downloads': 0,
+                'stars': 0,
                 'last_update_time': None,
                 'last_update_time_timestamp': 0,
                 'authors': local_info.get('authors', [])
@@ -521,97 +3462,836 @@ def process_plugin(plugin_folder, session):
         except:
             return None
 
-def scan_plugins(plugin_path, session):
-    """扫描插件目录，获取所有插件信息"""
+class PluginLogRouter(logging.Handler):
+    """按线程分流日志记录
+
+    工作线程处理插件时产生的日志记录写入各自的缓冲区，由主线程按插件顺序交给原有的处理器输出，
+    避免并发时不同插件的日志交错。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+        self._targets = []
+
+    @contextmanager
+    def install(self, target_logger):
+        """暂时用本处理器替换target_logger的处理器，原处理器作为输出目标"""
+        self._targets = list(target_logger.handlers)
+        target_logger.handlers = [self]
+        try:
+            yield self
+        finally:
+            target_logger.handlers = self._targets
+
+    def begin(self):
+        """为当前线程开启一个新的日志缓冲区"""
+        self._local.buffer = []
+
+    def end(self):
+        """结束当前线程的缓冲并返回其中的日志记录"""
+        buffer = getattr(self._local, 'buffer', None)
+        self._local.buffer = None
+        return buffer or []
+
+    def emit(self, record):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            self.replay([record])
+            return
+        # 参数可能在输出前被修改，缓冲时先完成格式化
+        record.msg = record.getMessage()
+        record.args = None
+        buffer.append(record)
+
+    def replay(self, records):
+        """把日志记录交给原有的处理器输出"""
+        for record in records:
+            for handler in self._targets:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+def list_plugin_folders(plugin_path):
+    """列出插件目录下的所有插件文件夹（按名称排序，保证输出顺序稳定）"""
+    folders = []
+    for item in sorted(os.listdir(plugin_path)):
+        plugin_folder = os.path.join(plugin_path, item)
+        if os.path.isdir(plugin_folder):
+            folders.append(plugin_folder)
+    return folders
+
+def compile_schema(schema, path='$'):
+    """把PLUGIN_INFO_SCHEMA格式的描述编译为校验函数
+
+    正则表达式只编译一次，返回的函数对每个值执行检查，把错误信息追加到errors中。
+    支持的键：type、required（用于properties中的字段）、pattern、items（列表元素）、
+    properties（字典的固定字段，未列出的字段视为错误）、keys/values（字典的任意键和对应的值）。
+    """
+    expected = schema.get('type')
+    types = expected if isinstance(expected, tuple) else (expected,) if expected else ()
+    type_names = '或'.join({str: '字符串', list: '列表', dict: '对象', int: '整数', bool: '布尔值'}.get(t, t.__name__)
+                          for t in types)
+    pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+    key_pattern = re.compile(schema['keys']) if 'keys' in schema else None
+    items = compile_schema(schema['items'], f'{path}[]') if 'items' in schema else None
+    values = compile_schema(schema['values'], f'{path}.*') if 'values' in schema else None
+    properties = {name: (compile_schema(spec, f'{path}.{name}'), spec.get('required', False))
+                  for name, spec in schema.get('properties', {}).items()}
+    
+    def check(value, errors, location=path):
+        if types and not isinstance(value, types):
+            errors.append(f"{location}: 应为{type_names}")
+            return
+        if pattern is not None and isinstance(value, str) and not pattern.search(value):
+            errors.append(f"{location}: 格式不正确: {value!r}")
+        if items is not None and isinstance(value, list):
+            for index, item in enumerate(value):
+                items(item, errors, f'{location}[{index}]')
+        if isinstance(value, dict):
+            if properties:
+                for name, (check_property, required) in properties.items():
+                    if name in value:
+                        check_property(value[name], errors, f'{location}.{name}')
+                    elif required:
+                        errors.append(f"{location}: 缺少必填字段 {name}")
+                for name in value:
+                    if name not in properties:
+                        errors.append(f"{location}: 未知字段 {name}")
+            for key, item in value.items():
+                if key_pattern is not None and not key_pattern.search(key):
+                    errors.append(f"{location}: 键格式不正确: {key!r}")
+                if values is not None:
+                    values(item, errors, f'{location}.{key}')
+    
+    return check
+
+def validate_plugin_infos(plugin_path):
+    """校验所有插件文件夹中的plugin_info.json，不访问网络
+
+    除了字段格式外，还检查插件ID与文件夹名是否一致、插件ID是否重复（不区分大小写）。
+
+    Returns:
+        tuple: (校验的插件数, [(文件夹名, 错误信息), ...])
+    """
+    validate = compile_schema(PLUGIN_INFO_SCHEMA)
+    problems = []
+    seen = {}
+    folders = list_plugin_folders(plugin_path)
+    for plugin_folder in folders:
+        folder_name = os.path.basename(plugin_folder)
+        info_path = os.path.join(plugin_folder, 'plugin_info.json')
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            problems.append((folder_name, "缺少plugin_info.json"))
+            continue
+        except (OSError, ValueError) as e:
+            problems.append((folder_name, f"无法解析plugin_info.json: {e}"))
+            continue
+        
+        errors = []
+        validate(info, errors)
+        problems.extend((folder_name, error) for error in errors)
+        if not isinstance(info, dict) or not isinstance(info.get('id'), str):
+            continue
+        
+        plugin_id = info['id']
+        if plugin_id != folder_name:
+            problems.append((folder_name, f"插件ID {plugin_id} 与文件夹名不一致"))
+        if plugin_id.lower() in seen:
+            problems.append((folder_name, f"插件ID {plugin_id} 与文件夹 {seen[plugin_id.lower()]} 重复"))
+        else:
+            seen[plugin_id.lower()] = folder_name
+    return len(folders), problems
+
+def get_changed_plugin_names(plugin_path, since):
+    """获取自指定git引用以来plugin_info.json有变化的插件文件夹名称
+    
+    Returns:
+        set | None: 插件文件夹名称集合，无法获取变更时返回None
+    """
+    import subprocess
+    try:
+        result = subprocess.run(
+            ['git', 'diff', '--name-only', '--relative', since, '--', plugin_path],
+            capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning("无法获取自 %s 以来的变更，将处理所有插件: %s", since, e)
+        return None
+    
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = os.path.relpath(line, plugin_path).replace(os.sep, '/').split('/')
+        if len(parts) == 2 and parts[1] == 'plugin_info.json':
+            names.add(parts[0])
+    return names
+
+def staleness_priority(existing_data, now, refreshed_at=None):
+    """计算插件数据的过期程度，值越大越需要刷新
+    
+    刷新间隔随仓库活跃度变化：最近有推送的仓库间隔短，长期不活跃的仓库间隔长
+    
+    Args:
+        existing_data: 插件的已有数据
+        now: 当前时间戳
+        refreshed_at: 最近一次刷新的时间戳，为None时使用已有数据中的更新时间
+    """
+    if refreshed_at is None:
+        refreshed_at = existing_data.get('update_time_timestamp') or 0
+    last_push = existing_data.get('last_update_time_timestamp') or 0
+    interval = min(STALE_MAX_INTERVAL, max(STALE_MIN_INTERVAL, (now - last_push) / STALE_ACTIVITY_FACTOR))
+    return (now - refreshed_at) / interval
+
+def plugin_staleness(catalogue, plugin_folder, now):
+    """目录中某个插件文件夹的过期程度"""
+    name = os.path.basename(plugin_folder)
+    return staleness_priority(catalogue.get(name), now, catalogue.refreshed_at(name))
+
+def select_plugin_folders(plugin_folders, catalogue, changed=None, refresh_slice=0):
+    """增量模式下选择本次需要处理的插件文件夹
+    
+    包括：目录中还没有的新插件、changed中的插件、以及按过期程度排序的前refresh_slice个其余插件
+    
+    Args:
+        plugin_folders: 所有插件文件夹
+        catalogue: 已有的插件目录（PluginCatalogue）
+        changed: 有变化的插件文件夹名称集合
+        refresh_slice: 额外刷新的插件数
+        
+    Returns:
+        list: 需要处理的插件文件夹（保持原有顺序）
+    """
+    now = time.time()
+    selected = set()
+    new_count = changed_count = 0
+    rest = []
+    for plugin_folder in plugin_folders:
+        name = os.path.basename(plugin_folder)
+        if name not in catalogue:
+            selected.add(plugin_folder)
+            new_count += 1
+        elif changed and name in changed:
+            selected.add(plugin_folder)
+            changed_count += 1
+        else:
+            rest.append(plugin_folder)
+    
+    rest.sort(key=lambda folder: plugin_staleness(catalogue, folder, now), reverse=True)
+    stale = rest[:max(0, refresh_slice)]
+    selected.update(stale)
+    
+    logger.info("增量模式: 新插件 %s 个，有变化 %s 个，刷新最久未更新 %s 个，跳过 %s 个",
+                new_count, changed_count, len(stale), len(rest) - len(stale))
+    return [plugin_folder for plugin_folder in plugin_folders if plugin_folder in selected]
+
+def prioritise_plugin_folders(plugin_folders, catalogue):
+    """按过期程度排序插件文件夹，最需要刷新的排在前面（额度不足时优先处理）"""
+    now = time.time()
+    return sorted(plugin_folders, key=lambda folder: plugin_staleness(catalogue, folder, now), reverse=True)
+
+def scan_plugins(plugin_path, repo_store, workers=1, catalogue=None, plugin_folders=None, budget=None,
+                 prefetched=False, metrics=None, deferred=None):
+    """扫描插件目录，获取所有插件信息
+    
+    Args:
+        plugin_path: 插件目录路径
+        repo_store: 仓库元数据层（RepoMetadataStore），所有插件共享
+        workers: 并发线程数，1 表示串行处理
+        catalogue: 已有的插件目录（PluginCatalogue）
+        plugin_folders: 需要处理的插件文件夹，为None时处理目录下的所有插件
+        budget: 速率限制预算（RateLimitBudget），额度不足时跳过剩余插件
+        prefetched: 仓库数据是否已预取，预取后不再按预估成本提前跳过插件
+        metrics: 运行统计（RunMetrics），记录每个插件的处理耗时
+        deferred: 列表，仓库暂时无法访问的插件文件夹会加入其中，由调用方在运行结束前重试；
+            为None时不推迟，直接保留已有数据
+        
+    Returns:
+        list: 插件数据列表，顺序与plugin_folders一致；因额度不足跳过的插件不在其中
+    """
     if not os.path.exists(plugin_path):
-        print(f"插件目录 {plugin_path} 不存在")
+        logger.error("插件目录 %s 不存在", plugin_path)
         return []
     
-    plugins = []
+    if plugin_folders is None:
+        plugin_folders = list_plugin_folders(plugin_path)
     
-    for item in os.listdir(plugin_path):
-        plugin_folder = os.path.join(plugin_path, item)
-        if os.path.isdir(plugin_folder):
-            print(f"处理插件: {item}")
-            plugin_data = process_plugin(plugin_folder, session)
+    def handle(plugin_folder, plugin_name, plugin_stats):
+        if budget is not None and not prefetched and not budget.can_afford():
+            budget.record_skipped()
+            plugin_stats['result'] = 'rate_limited'
+            logger.warning("API额度不足，跳过插件 %s，保留已有数据", plugin_name)
+            return None
+        
+        logger.debug("处理插件: %s", plugin_name)
+        try:
+            plugin_data = process_plugin(plugin_folder, repo_store, catalogue)
+        except RateLimitExhausted as e:
+            if budget is not None:
+                budget.record_skipped()
+            plugin_stats['result'] = 'rate_limited'
+            logger.warning("%s，跳过插件 %s，保留已有数据", e, plugin_name)
+            return None
+        except RepoUnavailable as e:
+            if e.circuit_open:
+                plugin_stats['result'] = 'circuit_open'
+                logger.info("%s，跳过插件 %s，保留已有数据", e, plugin_name)
+            elif deferred is not None:
+                plugin_stats['result'] = 'deferred'
+                deferred.append(plugin_folder)
+                logger.warning("%s，插件 %s 推迟到最后重试", e, plugin_name)
+            else:
+                plugin_stats['result'] = 'unavailable'
+                logger.warning("%s，插件 %s 保留已有数据", e, plugin_name)
+            return None
+        
+        if budget is not None:
+            budget.record_done()
+        if not plugin_data:
+            plugin_stats['result'] = 'no_data'
+        return plugin_data
+    
+    def process_one(plugin_folder):
+        plugin_name = os.path.basename(plugin_folder)
+        with metrics.plugin(plugin_name) if metrics is not None else nullcontext({}) as plugin_stats:
+            plugin_data = handle(plugin_folder, plugin_name, plugin_stats)
+        # 每个插件一行摘要，json格式下附带结构化字段
+        result = plugin_stats.get('result', 'ok')
+        if plugin_data or result == 'no_data':
+            fields = {'plugin': plugin_name, 'result': result,
+                      'version': plugin_data.get('latest_version') if plugin_data else None,
+                      'downloads': plugin_data.get('downloads') if plugin_data else None,
+                      'requests': plugin_stats.get('requests'),
+                      'seconds': round(plugin_stats['seconds'], 3) if 'seconds' in plugin_stats else None}
+            logger.log(logging.INFO if plugin_data else logging.WARNING,
+                       "插件 %s: %s，版本 %s，下载量 %s，%s 次请求，耗时 %ss", plugin_name, result,
+                       fields['version'], fields['downloads'], fields['requests'], fields['seconds'],
+                       extra={'fields': fields})
+        return plugin_data
+    
+    if workers <= 1:
+        plugins = []
+        for plugin_folder in plugin_folders:
+            plugin_data = process_one(plugin_folder)
             if plugin_data:
                 plugins.append(plugin_data)
+        return plugins
     
-    return plugins
-
-def update_plugins_json(plugin_path, data_path, plugins_json_path):
-    """更新plugins.json文件"""
-    # 确保数据目录存在
-    if not os.path.exists(data_path):
-        os.makedirs(data_path)
+    router = PluginLogRouter()
     
-    # 加载现有的插件数据
-    existing_plugins = []
-    if os.path.exists(plugins_json_path):
-        with open(plugins_json_path, 'r', encoding='utf-8') as f:
-            try:
-                existing_plugins = json.load(f)
-            except json.JSONDecodeError:
-                print(f"无法解析 {plugins_json_path}，将创建新文件")
-    
-    # 创建会话
-    session = create_session(RETRY_COUNT, TIMEOUT)
-    
-    # 扫描插件获取新数据
-    new_plugins = scan_plugins(plugin_path, session)
-    
-    # 更新或添加插件数据
-    updated_plugins = existing_plugins.copy()
-    for new_plugin in new_plugins:
-        found = False
-        for i, existing_plugin in enumerate(updated_plugins):
-            if existing_plugin.get('id') == new_plugin.get('id'):
-                updated_plugins[i] = new_plugin
-                found = True
-                break
-        
-        if not found:
-            updated_plugins.append(new_plugin)
+    def run(plugin_folder):
+        router.begin()
+        try:
+            plugin_data = process_one(plugin_folder)
+        finally:
+            records = router.end()
+        return plugin_data, records
     
-    # 保存更新后的插件数据
-    with open(plugins_json_path, 'w', encoding='utf-8') as f:
-        json.dump(updated_plugins, f, ensure_ascii=False, indent=2)
+    results = [None] * len(plugin_folders)
+    logs = [None] * len(plugin_folders)
+    next_to_emit = 0
     
-    print(f"已更新 {plugins_json_path}，共 {len(updated_plugins)} 个插件")
+    with router.install(logger):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, folder): index
+                       for index, folder in enumerate(plugin_folders)}
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index], logs[index] = future.result()
+                # 按插件顺序输出已完成的日志
+                while next_to_emit < len(plugin_folders) and logs[next_to_emit] is not None:
+                    router.replay(logs[next_to_emit])
+                    next_to_emit += 1
+    
+    return [plugin_data for plugin_data in results if plugin_data]
+
+@dataclass
+class ScraperConfig:
+    """抓取配置（默认值与命令行参数的默认值相同）"""
+    plugin_path: str = PLUGIN_PATH
+    data_path: str = DATA_PATH
+    token: str = None
+    ssl_verify: bool = SSL_VERIFY
+    timeout: float = TIMEOUT
+    retry_count: int = RETRY_COUNT
+    workers: int = WORKERS
+    cache_enabled: bool = CACHE_ENABLED
+    cache_dir: str = CACHE_DIR
+    cache_size_mb: int = CACHE_SIZE_MB
+    api_mode: str = API_MODE
+    engine: str = ENGINE
+    async_concurrency: int = ASYNC_CONCURRENCY
+    graphql_batch_size: int = GRAPHQL_BATCH_SIZE
+    graphql_fixtures: str = GRAPHQL_FIXTURES
+    graphql_record: bool = GRAPHQL_RECORD
+    release_state_path: str = RELEASE_STATE_PATH
+    catalogue_state_path: str = CATALOGUE_STATE_PATH
+    release_full_scan_hours: float = RELEASE_FULL_SCAN_HOURS
+    breaker_state_path: str = BREAKER_STATE_PATH
+    breaker_threshold: int = BREAKER_THRESHOLD
+    breaker_cooldown_hours: float = BREAKER_COOLDOWN_HOURS
+    since_ref: str = SINCE_REF
+    refresh_slice: int = REFRESH_SLICE
+    rate_limit_reserve: int = RATE_LIMIT_RESERVE
+    prometheus_path: str = PROMETHEUS_PATH
+    shards_enabled: bool = SHARDS_ENABLED
+    readme_mirror_enabled: bool = README_MIRROR_ENABLED
+    history_enabled: bool = HISTORY_ENABLED
+    changes_window: int = CHANGES_WINDOW
+
+    @property
+    def plugins_json_path(self):
+        return os.path.join(self.data_path, "plugins.json")
+
+    @property
+    def graphql_replay(self):
+        """是否从录制文件回放GraphQL响应（不访问GitHub）"""
+        return self.api_mode == 'graphql' and bool(self.graphql_fixtures) and not self.graphql_record
+
+    @classmethod
+    def from_args(cls, args, token=None):
+        """根据命令行参数创建配置"""
+        return cls(
+            plugin_path=args.plugins_dir,
+            data_path=args.data_dir,
+            token=token,
+            timeout=args.timeout,
+            retry_count=args.retry,
+            workers=max(1, args.workers),
+            cache_enabled=args.cache,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size,
+            api_mode=args.api,
+            engine=args.engine,
+            async_concurrency=args.concurrency,
+            graphql_batch_size=args.graphql_batch_size,
+            graphql_fixtures=args.graphql_fixtures,
+            graphql_record=args.graphql_record,
+            release_state_path=args.release_state,
+            catalogue_state_path=args.catalogue_state,
+            release_full_scan_hours=args.release_full_scan_hours,
+            breaker_state_path=args.breaker_state,
+            breaker_threshold=args.breaker_threshold,
+            breaker_cooldown_hours=args.breaker_cooldown_hours,
+            since_ref=args.since or ('HEAD~1' if args.only_changed else None),
+            refresh_slice=args.refresh_slice,
+            rate_limit_reserve=args.rate_limit_reserve,
+            prometheus_path=args.prometheus,
+            shards_enabled=args.shards,
+            readme_mirror_enabled=args.mirror_readme,
+            history_enabled=args.history,
+            changes_window=args.changes_window
+        )
+
+class CatalogueScraper:
+    """插件目录抓取器
+
+    所有配置来自ScraperConfig。HTTP会话（连接池）、响应缓存、release汇总、熔断器状态和内存中的插件目录
+    在创建时建立一次，之后每次调用run都复用，常驻模式下不需要重新加载；
+    每次运行只新建运行统计、速率限制预算和仓库元数据层（RepoMetadataStore按运行缓存结果）。
+
+    用法:
+        scraper = CatalogueScraper(ScraperConfig(token=token))
+        report = scraper.run()
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = ResponseCache(config.cache_dir, config.cache_size_mb * 1024 * 1024) if config.cache_enabled else None
+        self.session = create_session(config.retry_count, config.timeout, config.workers, self.cache,
+                                      token=config.token, verify=config.ssl_verify)
+        self.release_state = ReleaseStateStore(config.release_state_path, config.release_full_scan_hours * 3600)
+        self.breaker = RepoCircuitBreaker(config.breaker_state_path, config.breaker_threshold,
+                                          config.breaker_cooldown_hours * 3600)
+        self.catalogue = PluginCatalogue.load(config.plugins_json_path, config.catalogue_state_path)
+        self.history = HistoryStore(os.path.join(config.data_path, HISTORY_DIR_NAME)) if config.history_enabled else None
+        self._run_lock = Lock()
+
+    def all_plugin_folders(self):
+        """插件目录下的所有插件文件夹"""
+        plugin_path = self.config.plugin_path
+        return list_plugin_folders(plugin_path) if os.path.exists(plugin_path) else []
+
+    def run(self, plugin_folders=None, changed=None):
+        """运行一次抓取并写入数据目录
+
+        Args:
+            plugin_folders: 需要处理的插件文件夹，为None时按配置处理全部插件（或增量模式选择的插件）
+            changed: 有变化的插件文件夹名称，其中文件夹已被删除的插件会从目录中移除
+
+        Returns:
+            dict: 本次运行的报告（与run_report.json相同）
+        """
+        with self._run_lock:
+            return self._run(plugin_folders, changed)
+
+    def _run(self, plugin_folders, changed):
+        config = self.config
+        catalogue = self.catalogue
+        session = self.session
+        os.makedirs(config.data_path, exist_ok=True)
+        
+        budget = RateLimitBudget(config.rate_limit_reserve)
+        metrics = RunMetrics()
+        session.budget = budget
+        session.metrics = metrics
+        if self.cache is not None:
+            self.cache.hits = self.cache.misses = 0
+        self.breaker.begin_run()
+        
+        # 确定本次需要处理的插件（增量模式下只处理有变化或最久未更新的插件）
+        all_plugin_folders = self.all_plugin_folders()
+        changed = set(changed or ())
+        if plugin_folders is None:
+            plugin_folders = all_plugin_folders
+            if config.since_ref or config.refresh_slice > 0:
+                names = get_changed_plugin_names(config.plugin_path, config.since_ref) if config.since_ref else set()
+                if names is not None:
+                    changed |= names
+                    plugin_folders = select_plugin_folders(plugin_folders, catalogue, names, config.refresh_slice)
+        
+        # 额度预计不足以处理所有插件时，优先处理最久未更新的插件（回放录制文件时不查询额度）
+        if not config.graphql_replay:
+            budget.refresh(session)
+        if not budget.can_afford(len(plugin_folders)):
+            logger.warning("API额度预计不足以处理全部 %s 个插件，按过期程度优先处理", len(plugin_folders))
+            plugin_folders = prioritise_plugin_folders(plugin_folders, catalogue)
+        
+        # 扫描插件获取新数据（熔断器打开的仓库不预取）
+        breaker = self.breaker
+        if config.api_mode == 'graphql' or config.engine == 'async':
+            targets = [target for target in collect_repo_targets(plugin_folders) if not breaker.is_open(*target[:2])]
+        if config.api_mode == 'graphql':
+            client = GraphQLClient(session, config.graphql_fixtures, config.graphql_record)
+            repo_store = GraphQLRepoStore(session, client, config.graphql_batch_size, self.release_state, breaker)
+            repo_store.prefetch(targets)
+        elif config.engine == 'async':
+            repo_store = RepoMetadataStore(session, self.release_state, breaker)
+            prefetcher = AsyncRepoPrefetcher(repo_store, config.async_concurrency, config.retry_count, config.timeout,
+                                             self.cache, budget, metrics)
+            prefetcher.run(targets)
+        else:
+            repo_store = RepoMetadataStore(session, self.release_state, breaker)
+        prefetched = config.api_mode == 'graphql' or config.engine == 'async'
+        deferred = []
+        new_plugins = scan_plugins(config.plugin_path, repo_store, config.workers, catalogue, plugin_folders, budget,
+                                   prefetched, metrics, deferred)
+        
+        # 仓库暂时无法访问的插件在最后重试一次（使用新的元数据层，不复用失败的结果），仍然失败时保留已有数据
+        if deferred:
+            deferred_names = set(deferred)
+            retry_folders = [folder for folder in plugin_folders if folder in deferred_names]
+            logger.info("重试 %s 个仓库暂时无法访问的插件", len(retry_folders))
+            breaker.reset_run()
+            retry_store = RepoMetadataStore(session, self.release_state, breaker)
+            new_plugins += scan_plugins(config.plugin_path, retry_store, config.workers, catalogue, retry_folders,
+                                        budget, False, metrics)
+        
+        # 更新或添加插件数据
+        previous = catalogue.snapshot()
+        catalogue.merge(new_plugins)
+        
+        # 插件文件夹已被删除的插件从目录中移除：处理了所有插件时移除所有没有对应文件夹的插件，
+        # 增量模式下只移除变更中被删除的插件
+        folder_names = {os.path.basename(folder) for folder in all_plugin_folders}
+        if folder_names:
+            full_scan = len(plugin_folders) == len(all_plugin_folders) and budget.plugins_skipped == 0
+            keep = folder_names | {plugin.get('id') for plugin in new_plugins}
+            removed = [plugin_id for plugin_id in previous
+                       if plugin_id not in keep and (full_scan or plugin_id in changed)]
+            if removed:
+                logger.info("移除插件文件夹已删除的插件: %s", ', '.join(map(str, removed)))
+                catalogue.remove(removed)
+        
+        # 记录与上次运行相比的变更（第一次生成目录时不记录）
+        changeset = diff_catalogue(previous, catalogue.snapshot()) if previous else None
+        if changeset is not None:
+            feed = ChangeFeed(os.path.join(config.data_path, CHANGES_JSON_NAME), config.changes_window)
+            seq = feed.append(changeset)
+            feed.save()
+            feed.write_atom(os.path.join(config.data_path, CHANGES_ATOM_NAME))
+            logger.info("变更记录 #%s: 新增 %s，移除 %s，版本更新 %s，许可证变更 %s，下载量变化 %s", seq,
+                        len(changeset['added']), len(changeset['removed']), len(changeset['versions']),
+                        len(changeset['licenses']), len(changeset['downloads']))
+        
+        # 记录当天的历史快照，并把相对7天/30天前的增量和趋势排名写回插件数据
+        if self.history is not None:
+            today = datetime.now(BEIJING_TZ).date()
+            self.history.record(catalogue.to_list(), today)
+            trends = self.history.trends(catalogue.to_list(), today)
+            for plugin in catalogue.to_list():
+                catalogue.update({**plugin, 'trend': trends[plugin.get('id')]})
+            self.history.compact(today)
+            logger.info("历史快照: %s，%s 个插件有7天趋势排名", today.isoformat(),
+                        sum(1 for trend in trends.values() if trend['rank'] is not None))
+        
+        # 镜像README，catalogue中记录镜像文件相对于数据目录的路径
+        if config.readme_mirror_enabled:
+            mirrored = mirror_readmes(catalogue.to_list(), os.path.join(config.data_path, README_DIR_NAME), session,
+                                      config.workers, budget)
+            for plugin in catalogue.to_list():
+                plugin = {key: value for key, value in plugin.items() if key != 'readme_html'}
+                if plugin.get('id') in mirrored:
+                    plugin['readme_html'] = f'{README_DIR_NAME}/{plugin["id"]}.html'
+                catalogue.update(plugin)
+            logger.info("README镜像: %s 个插件", len(mirrored))
+        
+        # 保存更新后的插件数据（原子写入紧凑格式，内容没有变化时不重写）
+        shard_dir = os.path.join(config.data_path, SHARD_DIR_NAME) if config.shards_enabled else None
+        write_catalogue(catalogue.to_list(), config.plugins_json_path, shard_dir)
+        catalogue.save_state(config.catalogue_state_path)
+        
+        self.release_state.save()
+        breaker.finish_run()
+        breaker.save()
+        if self.cache is not None:
+            self.cache.save()
+        budget.report()
+        breaker.report()
+        
+        # 生成运行报告（与plugins.json放在同一目录）
+        report = metrics.build_report({
+            'config': {'api': config.api_mode, 'engine': config.engine, 'workers': config.workers,
+                       'cache': config.cache_enabled, 'incremental': len(plugin_folders) < len(all_plugin_folders)},
+            'rate_limit': budget.usage(),
+            'circuit_breaker': breaker.usage()
+        })
+        metrics.print_summary(report)
+        metrics.write_report(report, os.path.join(config.data_path, RUN_REPORT_NAME))
+        if config.prometheus_path:
+            metrics.write_prometheus(report, config.prometheus_path)
+        
+        logger.info("已更新 %s，共 %s 个插件", config.plugins_json_path, len(catalogue))
+        return report
+
+class CatalogueRequestHandler(BaseHTTPRequestHandler):
+    """常驻模式的HTTP接口
+
+    GET /plugins.json          当前插件目录（支持If-None-Match和gzip）
+    GET /plugins/<插件ID>.json  单个插件的数据
+    GET /status                 常驻进程的状态（最近一次运行、插件数、内容哈希）
+    数据目录中的其他文件（search_index.json、changes.json、readme/等）直接从磁盘读取
+    """
+
+    server_version = 'PluginCatalogue'
+
+    def do_GET(self):
+        path = unquote(urlparse(self.path).path)
+        published = self.server.daemon.published
+        if path == '/status':
+            return self.send_json(self.server.daemon.status())
+        if published is None:
+            return self.send_error(503, explain='插件目录尚未生成')
+        if path in ('/', '/plugins.json'):
+            return self.send_body(published['body'], 'application/json', published['etag'], published['gzip'])
+        plugin_id = path[len('/plugins/'):-len('.json')] if path.startswith('/plugins/') and path.endswith('.json') else None
+        # 不能用作插件ID的文件名（如分片索引）从磁盘读取
+        if plugin_id is not None and SHARD_ID_PATTERN.match(plugin_id):
+            plugin = published['plugins'].get(plugin_id)
+            if plugin is None:
+                return self.send_error(404, explain=f'插件 {plugin_id} 不存在')
+            return self.send_json(plugin, published['etag'])
+        return self.send_file(path)
+
+    def send_json(self, value, etag=None):
+        body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_body(body, 'application/json', etag)
+
+    def send_body(self, body, content_type, etag=None, compressed=None):
+        if etag is not None and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        if compressed is not None and accepts_gzip:
+            body = compressed
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, path):
+        """返回数据目录中的文件，不允许访问数据目录之外的路径"""
+        root = os.path.realpath(self.server.daemon.scraper.config.data_path)
+        file_path = os.path.realpath(os.path.join(root, path.lstrip('/')))
+        if os.path.commonpath([root, file_path]) != root or not os.path.isfile(file_path):
+            return self.send_error(404)
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        self.send_body(body, content_type, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def log_message(self, format, *args):
+        logger.debug("HTTP %s - %s", self.address_string(), format % args)
+
+class CatalogueDaemon:
+    """常驻模式：保持抓取器的缓存常驻内存，监视插件目录并按计划刷新插件
+
+    - plugins/下有插件的plugin_info.json新增、修改或删除时，只重新处理这些插件；
+    - 每隔refresh_interval秒按过期程度刷新refresh_slice个插件（与--refresh-slice相同的排序）；
+    - 通过本地HTTP接口提供当前的插件目录，每次运行后立即更新。
+    """
+
+    def __init__(self, scraper, host='127.0.0.1', port=8080, watch_interval=DAEMON_WATCH_INTERVAL,
+                 refresh_interval=DAEMON_REFRESH_INTERVAL, refresh_slice=DAEMON_REFRESH_SLICE):
+        self.scraper = scraper
+        self.host = host
+        self.port = port
+        self.watch_interval = watch_interval
+        self.refresh_interval = refresh_interval
+        self.refresh_slice = refresh_slice
+        self.published = None
+        self.fingerprints = {}
+        self.runs = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._server = None
+
+    def fingerprint(self):
+        """每个插件文件夹中plugin_info.json的(修改时间, 大小)，没有该文件时为None"""
+        fingerprints = {}
+        for plugin_folder in self.scraper.all_plugin_folders():
+            try:
+                stat = os.stat(os.path.join(plugin_folder, 'plugin_info.json'))
+                fingerprints[os.path.basename(plugin_folder)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                fingerprints[os.path.basename(plugin_folder)] = None
+        return fingerprints
+
+    def publish(self):
+        """更新HTTP接口提供的插件目录"""
+        plugins = self.scraper.catalogue.to_list()
+        body = json.dumps(plugins, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        content_hash = catalogue_hash(plugins)
+        self.published = {
+            'sha256': content_hash,
+            'etag': f'"{content_hash}"',
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=6, mtime=0),
+            'plugins': {plugin.get('id'): plugin for plugin in plugins}
+        }
+
+    def status(self):
+        published = self.published or {}
+        return {
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'plugins': len(published.get('plugins', {})),
+            'sha256': published.get('sha256'),
+            'watch_interval': self.watch_interval,
+            'refresh_interval': self.refresh_interval
+        }
+
+    def run_once(self, plugin_folders=None, changed=None):
+        """运行一次抓取并更新HTTP接口，出错时保留当前数据"""
+        try:
+            report = self.scraper.run(plugin_folders, changed)
+        except Exception as e:
+            logger.error("常驻模式运行出错，保留当前数据: %s", e, exc_info=True)
+            return
+        self.runs += 1
+        self.last_run = {'time': get_beijing_time(), 'plugins': len(plugin_folders) if plugin_folders is not None
+                         else len(self.fingerprints), 'results': report['plugins']['results']}
+        self.publish()
+
+    def start_server(self):
+        """在后台线程中启动HTTP接口"""
+        from http.server import ThreadingHTTPServer
+        self._server = ThreadingHTTPServer((self.host, self.port), CatalogueRequestHandler)
+        self._server.daemon = self
+        thread = threading.Thread(target=self._server.serve_forever, name='catalogue-http', daemon=True)
+        thread.start()
+        logger.info("HTTP接口: http://%s:%s/plugins.json", self.host, self._server.server_address[1])
+
+    def stop(self):
+        self._stop.set()
+
+    def serve(self):
+        """启动HTTP接口并进入监视循环，直到stop被调用"""
+        self.start_server()
+        self.fingerprints = self.fingerprint()
+        self.run_once()
+        next_refresh = time.monotonic() + self.refresh_interval
+        try:
+            while not self._stop.wait(self.watch_interval):
+                fingerprints = self.fingerprint()
+                changed = {name for name in fingerprints.keys() | self.fingerprints.keys()
+                           if fingerprints.get(name) != self.fingerprints.get(name)}
+                self.fingerprints = fingerprints
+                if changed:
+                    logger.info("插件目录有变化: %s", ', '.join(sorted(changed)))
+                    folders = [os.path.join(self.scraper.config.plugin_path, name)
+                               for name in sorted(changed) if name in fingerprints]
+                    self.run_once(folders, changed)
+                elif time.monotonic() >= next_refresh:
+                    folders = select_plugin_folders(self.scraper.all_plugin_folders(), self.scraper.catalogue,
+                                                    set(), self.refresh_slice)
+                    self.run_once(folders)
+                    next_refresh = time.monotonic() + self.refresh_interval
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            logger.info("常驻模式已停止")
 
 def main():
     """主函数"""
     # 解析命令行参数
     args = parse_arguments()
+    configure_logging(args.log_level, args.log_format)
     
-    global GITHUB_TOKEN, HEADERS, TIMEOUT, RETRY_COUNT, PLUGIN_PATH, DATA_PATH, PLUGINS_JSON_PATH
-    
-    # 更新全局配置
-    TIMEOUT = args.timeout
-    RETRY_COUNT = args.retry
-    PLUGIN_PATH = args.plugins_dir
-    DATA_PATH = args.data_dir
-    PLUGINS_JSON_PATH = os.path.join(DATA_PATH, "plugins.json")
+    if args.validate_only:
+        start = time.perf_counter()
+        count, problems = validate_plugin_infos(args.plugins_dir)
+        for folder_name, message in problems:
+            logger.error("%s: %s", folder_name, message)
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info("校验了 %s 个插件，发现 %s 个问题，耗时 %.1fms", count, len(problems), elapsed)
+        return 1 if problems else 0
     
     # 加载GitHub令牌
-    GITHUB_TOKEN = load_github_token()
-    if not GITHUB_TOKEN:
-        print("错误: 未找到GitHub令牌，请检查.config文件或GITHUB_TOKEN环境变量")
+    config = ScraperConfig.from_args(args, load_github_token())
+    # 回放GraphQL录制文件时不访问GitHub，可以不提供令牌
+    if not config.token and not config.graphql_replay:
+        logger.error("未找到GitHub令牌，请检查.config文件或GITHUB_TOKEN环境变量")
         return 1
     
-    # 设置请求头
-    HEADERS = {
-        'User-Agent': 'MCDReforged-Plugin-Scraper',
-        'Authorization': f'token {GITHUB_TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
-    
-    print(f"开始更新插件数据，超时时间: {TIMEOUT}秒，重试次数: {RETRY_COUNT}")
-    print(f"插件目录: {PLUGIN_PATH}, 数据目录: {DATA_PATH}")
+    logger.info("开始更新插件数据，超时时间: %s秒，重试次数: %s，并发线程数: %s",
+                config.timeout, config.retry_count, config.workers)
+    logger.info("插件目录: %s, 数据目录: %s", config.plugin_path, config.data_path)
+    if config.cache_enabled:
+        logger.info("HTTP响应缓存: %s（上限 %sMB）", config.cache_dir, config.cache_size_mb)
+    if config.api_mode == 'graphql':
+        logger.info("使用GraphQL批量查询，每批 %s 个仓库", config.graphql_batch_size)
+    elif config.engine == 'async':
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            logger.error("async引擎需要安装httpx，请运行 pip install \"httpx[http2]\"")
+            return 1
+        logger.info("使用async引擎，最大并发请求数: %s", config.async_concurrency)
     
-    # 更新plugins.json
-    update_plugins_json(PLUGIN_PATH, DATA_PATH, PLUGINS_JSON_PATH)
+    scraper = CatalogueScraper(config)
+    if not args.daemon:
+        # 更新plugins.json
+        scraper.run()
+        return 0
     
+    host, _, port = args.listen.rpartition(':')
+    daemon = CatalogueDaemon(scraper, host or '127.0.0.1', int(port), args.watch_interval, args.refresh_interval,
+                             args.refresh_slice or DAEMON_REFRESH_SLICE)
+    # 收到SIGTERM（如docker stop、systemctl stop）时在当前运行结束后退出
+    import signal
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
     return 0
 
 if __name__ == "__main__":